@@ -1,30 +1,46 @@
 # cache_simulation/cache.py
 
-from typing import Any, Dict, Callable, Optional
+import logging
+from collections import deque
+from typing import Any, Dict, Callable, Generator, Optional
 
 import simpy
 
 from cache_simulation.logger import get_logger
-from cache_simulation.metrics import MetricsCollector
+from cache_simulation.metrics import (
+    HIT_CORRECT, HIT_INCORRECT, MISS, STALE_INITIAL, STALE_REPEAT, MetricsCollector,
+)
 from cache_simulation.strategies.base import CacheStrategy
 
 logger = get_logger(__name__)
 
+# сколько последних записей «CACHE UPDATE» держит буфер до flush_log()
+_UPDATE_LOG_SIZE = 1 << 15
+
 
 class CacheEntry:
     """
-    Запись кеша.
+    Запись кеша. Содержит только поля, нужные для проверки актуальности;
+    само значение хранится отдельно в `Cache._values` и читается лишь при
+    подтверждённом HIT. При обновлении запись заменяется новой, флаг
+    stale_seen выставляется на месте.
     Attributes:
-        value: результат последнего запроса.
         version: версия данных внешнего источника.
         timestamp: время (env.now) последнего обновления.
+        stale_seen: устаревание записи уже зафиксировано (stale_initial).
     """
-    __slots__ = ("value", "version", "timestamp")
 
-    def __init__(self, value: Any, version: int, timestamp: float):
-        self.value = value
+    # слоты: без __dict__, чтение полей — специализированный доступ к слоту
+    __slots__ = ("version", "timestamp", "stale_seen")
+
+    def __init__(self, version: int, timestamp: float, stale_seen: bool = False):
         self.version = version
         self.timestamp = timestamp
+        self.stale_seen = stale_seen
+
+    def __repr__(self) -> str:
+        return (f"CacheEntry(version={self.version!r}, timestamp={self.timestamp!r}, "
+                f"stale_seen={self.stale_seen!r})")
 
 
 class Cache:
@@ -35,57 +51,81 @@ class Cache:
     def __init__(
             self,
             env: simpy.Environment,
-            source_request_fn: Callable[[Any], simpy.Event],
+            source_request_fn: Callable[[Any], Generator],
             strategy: CacheStrategy,
             metrics: MetricsCollector
     ):
         self.env = env
         self._source_fn = source_request_fn
         self._strategy = strategy
+        # предикат актуальности, специализированный стратегией один раз
+        self._is_valid = strategy.make_validator()
+        # обработчики стратегии; None — пустой обработчик, вызов пропускается
+        self._on_access = strategy.on_access if strategy.HAS_ON_ACCESS else None
+        self._on_update = strategy.on_update if strategy.HAS_ON_UPDATE else None
         self._metrics = metrics
+        # регистраторы метрик горячего пути, связанные один раз
+        self._ingest_row = metrics.ingest_event_row
+        self._record_event = metrics.record_event
 
-        # Основное хранилище и вспомогательные структуры
+        # Основное хранилище (метаданные записей), значения и вспомогательные структуры
         self._store: Dict[Any, CacheEntry] = {}
-        self._stale_seen: set = set()
+        self._values: Dict[Any, Any] = {}
         self._inflight: Dict[Any, simpy.events.Event] = {}
+        # буфер «CACHE UPDATE»-записей: логируются пачкой в flush_log(), а не из _do_fetch
+        self._update_log: deque = deque(maxlen=_UPDATE_LOG_SIZE)
 
         # Константы
         self._hit_delay = 1e-3
+        # уровни логирования фиксируются при создании кеша (после setup_logging):
+        # на горячем пути остаётся проверка атрибута вместо вызова isEnabledFor
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        self._info = logger.isEnabledFor(logging.INFO)
 
     def __len__(self) -> int:
         return len(self._store)
 
-    def request(self, key: Any, *, is_prefetch: bool = False):
+    def flush_log(self) -> None:
         """
-        Возвращает процесс SimPy, который выполнит запрос:
-        - при hit: отдаст результат с минимальной задержкой,
-        - при miss/stale или prefetch: консолидирует fetch к источнику.
+        Вывести накопленные записи об обновлениях кеша (вызывается в конце симуляции).
+        Буфер ограничен: при переполнении остаются последние _UPDATE_LOG_SIZE записей.
         """
-        return self.env.process(self._handle_request(key, is_prefetch))
+        while self._update_log:
+            now, key, version = self._update_log.popleft()
+            logger.info("t=%.2f: CACHE UPDATE key=%s -> version=%s", now, key, version)
 
     # ------------------------------------------------------------------------- #
-    #                               Основной процесс                           #
+    #                               Основной запрос                            #
     # ------------------------------------------------------------------------- #
-    def _handle_request(self, key: Any, is_prefetch: bool):
+    def request(self, key: Any, *, is_prefetch: bool = False):
+        """
+        Генератор запроса к кешу; вызывающий процесс делает `yield from`:
+        - при hit: отдаст результат с минимальной задержкой,
+        - при miss/stale или prefetch: консолидирует fetch к источнику.
+
+        Отдельный SimPy-процесс на каждый запрос не создаётся — процесс
+        порождается только для общего fetch-а (см. `_execute_fetch`).
+        """
         start = self.env.now
         entry = self._store.get(key)
         cache_size = len(self._store)
 
         # 1) Предиктивный prefetch — сразу в MISS-ветку
         if is_prefetch:
-            self._metrics.record_event(start, "prefetch_attempt", key, cache_size)
+            self._record_event(start, "prefetch_attempt", key, cache_size)
         else:
             # 2) Попытка HIT
-            if entry and self._strategy.is_valid(entry, start):
-                return (yield from self._serve_hit(entry, key, start, cache_size))
+            if entry and self._is_valid(entry, start):
+                return self._serve_hit(entry, key, start, cache_size)
 
             # 3) Отметка stale-состояния перед MISS
             if entry:
                 self._mark_stale(entry, key, start, cache_size)
 
             # 4) Нативный MISS
-            self._metrics.record_event(start, "miss", key, cache_size)
-            logger.debug(f"t={start:.2f}: CACHE MISS key={key}")
+            self._record_event(start, "miss", key, cache_size)
+            if self._debug:
+                logger.debug("t=%.2f: CACHE MISS key=%s", start, key)
 
         # 5) Консолидация и выполнение fetch-а
         value, version = yield from self._execute_fetch(key, entry, start)
@@ -98,34 +138,36 @@ class Cache:
     def _serve_hit(self, entry: CacheEntry, key: Any, start: float, cache_size: int):
         """
         Обработать корректный или некорректный hit,
-        записать метрики, выполнить лёгкую задержку и вернуть результат.
+        записать метрики и вернуть результат.
+
+        Задержка на чтение не моделируется событием SimPy: она несравнимо мала,
+        поэтому просто прибавляется к моменту завершения в метриках.
         """
-        now = self.env.now
+        # hit обслуживается синхронно внутри request(): время то же, что start
+        now = start
+        version = entry.version
+        actual = key.version
         age = now - entry.timestamp
 
-        if entry.version == key.version:
-            self._metrics.record_entry_age_on_hit(age)
-            self._metrics.record_correct_hit(now - start)
-            call_type = "hit_correct"
-            logger.debug(f"t={now:.2f}: CACHE HIT_CORRECT key={key} v={entry.version}")
+        if version == actual:
+            kind = HIT_CORRECT
+            if self._debug:
+                logger.debug("t=%.2f: CACHE HIT_CORRECT key=%s v=%s", now, key, version)
         else:
-            self._metrics.record_entry_age_on_hit(age)
-            self._metrics.record_incorrect_hit(now - start)
-            call_type = "hit_incorrect"
-            logger.debug(
-                f"t={now:.2f}: CACHE HIT_INCORRECT key={key} "
-                f"cached={entry.version} actual={key.version}"
-            )
-
-        self._metrics.record_event(now, call_type, key, cache_size)
-        self._strategy.on_access(entry, now)
+            kind = HIT_INCORRECT
+            if self._debug:
+                logger.debug(
+                    "t=%.2f: CACHE HIT_INCORRECT key=%s cached=%s actual=%s",
+                    now, key, version, actual,
+                )
 
-        # небольшая симуляционная задержка на чтение
-        yield self.env.timeout(self._hit_delay)
+        if self._on_access is not None:
+            self._on_access(entry, now)
 
-        finish = self.env.now
-        self._metrics.record_cache_call(key, start, finish, call_type, entry.version)
-        return entry.value, entry.version
+        # небольшая симуляционная задержка на чтение — без обращения к планировщику
+        finish = start + self._hit_delay
+        self._ingest_row(kind, now, 0.0, age, key, cache_size, version, finish)
+        return self._values[key], version
 
     # ------------------------------------------------------------------------- #
     #                              Отметка STALE                                #
@@ -135,19 +177,19 @@ class Cache:
         Зарегистрировать первое и последующие stale-состояния записи.
         """
         age = now - entry.timestamp
-        if key not in self._stale_seen:
-            self._stale_seen.add(key)
-            self._metrics.record_entry_age_on_stale(age)
-            self._metrics.record_stale_initial()
-            event = "stale_initial"
-            logger.debug(f"t={now:.2f}: CACHE STALE_INITIAL key={key}, age={age:.2f}")
+        if not entry.stale_seen:
+            # первое устаревание: флаг поднимается на месте;
+            # свежая запись из _do_fetch снова начинается с stale_seen=False
+            entry.stale_seen = True
+            kind = STALE_INITIAL
+            if self._debug:
+                logger.debug("t=%.2f: CACHE STALE_INITIAL key=%s, age=%.2f", now, key, age)
         else:
-            self._metrics.record_entry_age_on_stale(age)
-            self._metrics.record_stale_repeat()
-            event = "stale_repeat"
-            logger.debug(f"t={now:.2f}: CACHE STALE_REPEAT key={key}, age={age:.2f}")
+            kind = STALE_REPEAT
+            if self._debug:
+                logger.debug("t=%.2f: CACHE STALE_REPEAT key=%s, age=%.2f", now, key, age)
 
-        self._metrics.record_event(now, event, key, cache_size)
+        self._ingest_row(kind, now, 0.0, age, key, cache_size, entry.version)
 
     # ------------------------------------------------------------------------- #
     #                        Консолидация и fetch‐логику                       #
@@ -165,17 +207,12 @@ class Cache:
             fetch_evt = self.env.process(self._do_fetch(key, old_ver))
             self._inflight[key] = fetch_evt
 
-        # 2) Ждём результат
+        # 2) Ждём результат (inflight-запись снимает сам _do_fetch)
         value, version = yield fetch_evt
 
-        # 3) Убираем из inflight первым завершившимся
-        if self._inflight.get(key) is fetch_evt:
-            del self._inflight[key]
-
-        # 4) Запись метрик miss и cache_call
+        # 3) Запись метрик miss и cache_call
         finish = self.env.now
-        self._metrics.record_miss(finish - start)
-        self._metrics.record_cache_call(key, start, finish, "miss", version)
+        self._ingest_row(MISS, start, finish - start, 0.0, key, 0, version, finish)
 
         return value, version
 
@@ -185,12 +222,16 @@ class Cache:
     def _do_fetch(self, key: Any, old_version: Optional[int]):
         """
         Фоновый процесс единственного fetch-а для данного ключа:
-        1) вызываем внешний источник,
-        2) обновляем store и stale-флаги,
+        1) вызываем внешний источник и снимаем inflight-запись
+           (один раз на fetch, а не в каждом ожидающем),
+        2) обновляем store (stale-флаг новой записи сброшен),
         3) логируем и уведомляем стратегию.
         """
         # 1) Запрос в «чёрный ящик»
-        value, version = yield from self._call_source(key)
+        try:
+            value, version = yield from self._call_source(key)
+        finally:
+            self._inflight.pop(key, None)
 
         now = self.env.now
         # 2) Метрики по обновлениям
@@ -200,11 +241,13 @@ class Cache:
             self._metrics.record_redundant_miss()
 
         # 3) Обновляем запись
-        self._store[key] = CacheEntry(value, version, now)
-        self._stale_seen.discard(key)
+        self._values[key] = value
+        entry = self._store[key] = CacheEntry(version, now)
 
-        logger.info(f"t={now:.2f}: CACHE UPDATE key={key} -> version={version}")
-        self._strategy.on_update(self._store[key], now)
+        if self._info:
+            self._update_log.append((now, key, version))
+        if self._on_update is not None:
+            self._on_update(entry, now)
 
         return value, version
 
@@ -213,7 +256,8 @@ class Cache:
     # ------------------------------------------------------------------------- #
     def _call_source(self, key: Any):
         """
-        Делегируем fetch «чёрному ящику» — просто yield из SimPy-процесса.
+        Делегируем fetch «чёрному ящику»: source_request_fn возвращает
+        генератор, который выполняется внутри процесса _do_fetch через yield from.
         """
-        result = yield self._source_fn(key)
+        result = yield from self._source_fn(key)
         return result
@@ -9,16 +9,53 @@
 
 from __future__ import annotations
 
+import logging
 import math
 import random
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Generator, Optional
 
+import numpy as np
 import simpy
 
+from cache_simulation.des_core import scheduler
 from cache_simulation.logger import get_logger
+from cache_simulation.sampling import sinusoid_interval
 
 logger = get_logger(__name__)
 
+# сколько inter-arrival интервалов Client генерирует за одно обращение к NumPy
+_ARRIVAL_BATCH = 4096
+
+
+def _dispatch(env: simpy.Environment, request: Generator) -> None:
+    """
+    Запустить генератор обработки заявки без отдельного SimPy-процесса.
+
+    Заявка выполняется синхронно до первого ожидаемого события: HIT кеша
+    завершается сразу и не стоит ни одного Process. Процесс порождается
+    только для заявок, которые действительно ждут (fetch к источнику).
+    """
+    try:
+        event = next(request)
+    except StopIteration:
+        return
+    env.process(_resume(request, event))
+
+
+def _resume(request: Generator, event: simpy.Event):
+    """Процесс, доводящий уже запущенный генератор до конца начиная с ожидания event."""
+    while True:
+        try:
+            value = yield event
+        except Exception as exc:
+            step, arg = request.throw, exc
+        else:
+            step, arg = request.send, value
+        try:
+            event = step(arg)
+        except StopIteration as stop:
+            return stop.value
+
 
 # --------------------------------------------------------------------------- #
 #   БАЗОВЫЙ КЛАСС (как был)                                                   #
@@ -29,16 +66,23 @@ class Client:
     inter-arrival (оставляем без изменений, кроме мелких правок typing).
     """
 
+    __slots__ = (
+        "env", "cache_request_fn", "arrival_rate", "interarrival_fn", "key_generator",
+        "start_time", "name_prefix", "_counter", "_rng", "_batch", "_debug", "_info",
+        "_call_later",
+    )
+
     def __init__(
             self,
             env: simpy.Environment,
-            cache_request_fn: Callable[[Any], simpy.Event],
+            cache_request_fn: Callable[[Any], Generator],
             *,
             arrival_rate: Optional[float] = None,
             interarrival_fn: Optional[Callable[[], float]] = None,
             key_generator: Optional[Callable[[str], Any]] = None,
             start_time: float = 0.0,
             name_prefix: str = "Client",
+            rng: Optional[random.Random] = None,
     ):
         self.env = env
         self.cache_request_fn = cache_request_fn
@@ -48,38 +92,59 @@ class Client:
         self.start_time = start_time
         self.name_prefix = name_prefix
         self._counter = 0
+        # уровни логирования фиксируются при создании клиента: в _handle_request
+        # проверяется атрибут, а не вызывается isEnabledFor на каждую заявку
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        self._info = logger.isEnabledFor(logging.INFO)
+
+        # пачка заранее сгенерированных интервалов для _default_interarrival;
+        # генератор NumPy сидируется из rng симуляции (по умолчанию — глобальный `random`),
+        # чтобы seed симуляции сохранял силу
+        seed_source = rng or random
+        self._rng = np.random.default_rng(seed_source.getrandbits(64)) if arrival_rate is not None else None
+        self._batch = iter(())
 
         logger.info(
-            f"[Client] started: λ={arrival_rate}, start={start_time}, prefix={name_prefix}"
+            "[Client] started: λ=%s, start=%s, prefix=%s", arrival_rate, start_time, name_prefix
         )
-        env.process(self._generate_clients())
+        # поток заявок — цепочка отложенных вызовов, а не SimPy-процесс
+        self._call_later = scheduler(env)
+        self._call_later(start_time, self._begin)
 
     # ------------------------------------------------------------------ #
     def _default_interarrival(self) -> float:
         if self.arrival_rate is None:
             raise ValueError("Either arrival_rate or interarrival_fn must be provided")
-        return random.expovariate(self.arrival_rate)
+        try:
+            return next(self._batch)
+        except StopIteration:
+            taus = self._rng.exponential(1.0 / self.arrival_rate, _ARRIVAL_BATCH)
+            self._batch = iter(taus.tolist())
+            return next(self._batch)
 
     # ------------------------------------------------------------------ #
-    def _generate_clients(self):
-        yield self.env.timeout(self.start_time)
-        logger.info(f"[Client] generation begins at t={self.env.now:.2f}")
-        while True:
-            self._counter += 1
-            client_id = f"{self.name_prefix}-{self._counter}"
-            key = self.key_generator(client_id)
+    def _begin(self) -> None:
+        logger.info("[Client] generation begins at t=%.2f", self.env.now)
+        self._arrive()
 
-            self.env.process(self._handle_request(client_id, key))
+    def _arrive(self) -> None:
+        """Очередная заявка; следующая планируется через interarrival_fn()."""
+        self._counter += 1
+        client_id = f"{self.name_prefix}-{self._counter}"
+        key = self.key_generator(client_id)
 
-            interval = self.interarrival_fn()
-            yield self.env.timeout(interval)
+        _dispatch(self.env, self._handle_request(client_id, key))
+
+        self._call_later(self.interarrival_fn(), self._arrive)
 
     def _handle_request(self, client_id: str, key: Any):
         start = self.env.now
-        logger.debug(f"t={start:.2f}: {client_id} → key={key}")
-        yield self.cache_request_fn(key)
-        end = self.env.now
-        logger.info(f"t={end:.2f}: {client_id} done (wait {end - start:.3f})")
+        if self._debug:
+            logger.debug("t=%.2f: %s → key=%s", start, client_id, key)
+        yield from self.cache_request_fn(key)
+        if self._info:
+            end = self.env.now
+            logger.info("t=%.2f: %s done (wait %.3f)", end, client_id, end - start)
 
 
 # --------------------------------------------------------------------------- #
@@ -91,14 +156,16 @@ class CyclicClient:
 
     Λ(t) = λ_base · (1 + A · sin(2π t / P)),              0 ≤ A ≤ 1
 
-    Реализован классический метод «отклонения» (thinning) для
-    нестационарного пуассоновского процесса.
+    Интервалы нестационарного пуассоновского процесса генерируются обращением
+    интегральной интенсивности Λ(t) (без отбраковки кандидатов, как в thinning):
+    одна экспоненциальная величина на заявку.
 
     Parameters
     ----------
     env : simpy.Environment
     cache_request_fn : Callable
-        Функция «сделать запрос к кешу».
+        Функция «сделать запрос к кешу»; возвращает генератор, из которого
+        процесс клиента делает `yield from`.
     λ_base : float
         Средняя интенсивность.
     amplitude : float
@@ -109,12 +176,21 @@ class CyclicClient:
         Отложенный старт генерации.
     name_prefix : str
         Для красивых логов.
+    rng : random.Random | None
+        Источник случайности симуляции, из которого сидируется генератор NumPy
+        (по умолчанию — глобальный `random`).
     """
 
+    __slots__ = (
+        "env", "cache_request_fn", "lambda_base", "amplitude", "period", "key_generator",
+        "start_time", "name_prefix", "_counter", "_omega", "_amp_base", "_rng", "_units",
+        "_debug", "_info", "_call_later",
+    )
+
     def __init__(
             self,
             env: simpy.Environment,
-            cache_request_fn: Callable[[Any], simpy.Event],
+            cache_request_fn: Callable[[Any], Generator],
             *,
             lambda_base: float,
             amplitude: float,
@@ -122,6 +198,7 @@ class CyclicClient:
             key_generator: Optional[Callable[[str], Any]] = None,
             start_time: float = 0.0,
             name_prefix: str = "CyclicClient",
+            rng: Optional[random.Random] = None,
     ):
         if not (0.0 <= amplitude <= 1.0):
             raise ValueError("amplitude must be within [0, 1]")
@@ -137,52 +214,66 @@ class CyclicClient:
         self.start_time = start_time
         self.name_prefix = name_prefix
         self._counter = 0
+        # уровни логирования фиксируются при создании клиента: в _handle_request
+        # проверяется атрибут, а не вызывается isEnabledFor на каждую заявку
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        self._info = logger.isEnabledFor(logging.INFO)
 
-        # верхняя граница для метода thinning
-        self._lambda_max = self.lambda_base * (1 + self.amplitude)
+        # инварианты формулы λ(t), чтобы не пересчитывать их на каждой заявке
+        self._omega = 2.0 * math.pi / period
+        self._amp_base = lambda_base * amplitude
+        # Exp(1)-величины для обращения Λ(t) — пачками из генератора NumPy,
+        # сидированного из rng симуляции (по умолчанию — глобальный `random`)
+        self._rng = np.random.default_rng((rng or random).getrandbits(64))
+        self._units = iter(())
 
         logger.info(
-            f"[CyclicClient] λ_base={lambda_base}, A={amplitude}, P={period}, "
-            f"λ_max={self._lambda_max}"
+            "[CyclicClient] λ_base=%s, A=%s, P=%s", lambda_base, amplitude, period
         )
-        env.process(self._generate_clients())
+        self._call_later = scheduler(env)
+        self._call_later(start_time, self._begin)
 
     # ------------------------------------------------------------------ #
-    #   Основной генератор                                               #
+    #   Поток заявок (цепочка отложенных вызовов)                        #
     # ------------------------------------------------------------------ #
-    def _generate_clients(self):
-        yield self.env.timeout(self.start_time)
-        logger.info(f"[CyclicClient] begins at t={self.env.now:.2f}")
-
-        while True:
-            # inhomogeneous Poisson – Lewis–Shedler thinning
-            t_cur = self.env.now
-            while True:
-                # 1) кандидат
-                tau = random.expovariate(self._lambda_max)
-                t_cur += tau
-                # 2) вероятность принятия
-                lam_t = self._instant_rate(t_cur)
-                if random.random() <= lam_t / self._lambda_max:
-                    break  # заявка принята
-
-            # дождались до времени t_cur
-            yield self.env.timeout(t_cur - self.env.now)
-
-            # создаём клиента
-            self._counter += 1
-            client_id = f"{self.name_prefix}-{self._counter}"
-            key = self.key_generator(client_id)
-            self.env.process(self._handle_request(client_id, key))
+    def _begin(self) -> None:
+        logger.info("[CyclicClient] begins at t=%.2f", self.env.now)
+        self._schedule_next()
+
+    def _schedule_next(self) -> None:
+        # inhomogeneous Poisson – обращение интегральной интенсивности
+        self._call_later(self._sample_next(self.env.now), self._arrive)
+
+    def _arrive(self) -> None:
+        # создаём клиента
+        self._counter += 1
+        client_id = f"{self.name_prefix}-{self._counter}"
+        key = self.key_generator(client_id)
+        _dispatch(self.env, self._handle_request(client_id, key))
+        self._schedule_next()
 
     # ------------------------------------------------------------------ #
-    def _instant_rate(self, t: float) -> float:
-        """λ(t) по формуле синуса."""
-        return self.lambda_base * (1.0 + self.amplitude * math.sin(2 * math.pi * t / self.period))
+    def _next_unit(self) -> float:
+        try:
+            return next(self._units)
+        except StopIteration:
+            self._units = iter(self._rng.exponential(1.0, _ARRIVAL_BATCH).tolist())
+            return next(self._units)
+
+    def _sample_next(self, t: float) -> float:
+        """
+        Интервал до следующей заявки после момента t: U ~ Exp(1) берётся из
+        пачки NumPy, решение уравнения — в `sinusoid_interval`.
+        """
+        return sinusoid_interval(
+            t, self._next_unit(), self.lambda_base, self._amp_base, self._omega
+        )
 
     def _handle_request(self, client_id: str, key: Any):
         start = self.env.now
-        logger.debug(f"t={start:.2f}: {client_id} → key={key}")
-        yield self.cache_request_fn(key)
-        end = self.env.now
-        logger.info(f"t={end:.2f}: {client_id} done (wait {end - start:.3f})")
+        if self._debug:
+            logger.debug("t=%.2f: %s → key=%s", start, client_id, key)
+        yield from self.cache_request_fn(key)
+        if self._info:
+            end = self.env.now
+            logger.info("t=%.2f: %s done (wait %.3f)", end, client_id, end - start)
@@ -2,15 +2,59 @@
 Pydantic-конфиг проекта (расширен поддержкой циклического клиента).
 """
 
+import functools
 import os
-from typing import Optional, Literal
+from typing import Any, Dict, Optional, Literal, Type, TypeVar, get_args
 
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+try:  # libyaml-парсер заметно быстрее чисто питоновского SafeLoader
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: no cover - PyYAML собран без libyaml
+    from yaml import SafeLoader as _SafeLoader
+
+_M = TypeVar("_M", bound=BaseModel)
+
+
+# ---------- доверенная сборка без валидации ----------
+def _nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """Вложенная модель из аннотации поля (в т.ч. `Optional[Model]`), иначе None."""
+    for tp in (annotation, *get_args(annotation)):
+        if isinstance(tp, type) and issubclass(tp, BaseModel):
+            return tp
+    return None
+
+
+def _construct(model: Type[_M], data: Dict[str, Any]) -> _M:
+    """
+    Рекурсивный `model_construct`: ключи-алиасы (`format` → `fmt`)
+    переводятся в имена полей, вложенные словари собираются в свои модели.
+    Типы и Literal-значения НЕ проверяются.
+    """
+    values = {}
+    for name, field in model.model_fields.items():
+        key = field.alias if field.alias is not None and field.alias in data else name
+        if key not in data:
+            continue  # подставит default из model_construct
+        value = data[key]
+        sub = _nested_model(field.annotation)
+        if sub is not None and isinstance(value, dict):
+            value = _construct(sub, value)
+        values[name] = value
+    return model.model_construct(**values)
+
+
+class _ConfigModel(BaseModel):
+    """
+    База всех моделей конфига: экземпляры неизменяемы — `Settings.load`
+    отдаёт один и тот же закешированный объект всем вызывающим.
+    """
+    model_config = ConfigDict(frozen=True)
 
 
 # ---------- логирование ----------
-class FileLogConfig(BaseModel):
+class FileLogConfig(_ConfigModel):
     path: str
     max_bytes: int = Field(..., alias="max_bytes")
     backup_count: int
@@ -18,19 +62,19 @@ class FileLogConfig(BaseModel):
     fmt: str = Field(..., alias="format")
 
 
-class ConsoleLogConfig(BaseModel):
+class ConsoleLogConfig(_ConfigModel):
     level: str
     fmt: str = Field(..., alias="format")
 
 
-class LoggingConfig(BaseModel):
+class LoggingConfig(_ConfigModel):
     file: FileLogConfig
     console: ConsoleLogConfig
     date_format: str
 
 
 # ---------- симулятор ----------
-class SimulatorConfig(BaseModel):
+class SimulatorConfig(_ConfigModel):
     random_seed: int
     sim_time: float
     arrival_pattern: Literal["poisson", "cyclic"] = "poisson"
@@ -42,7 +86,7 @@ class SimulatorConfig(BaseModel):
 
 
 # ---------- внешний источник ----------
-class ExternalSourceConfig(BaseModel):
+class ExternalSourceConfig(_ConfigModel):
     min_service: float
     max_service: float
     update_pattern: Literal["poisson", "cyclic"] = "poisson"
@@ -52,22 +96,22 @@ class ExternalSourceConfig(BaseModel):
 
 
 # ---------- ресурсы ----------
-class ResourcesConfig(BaseModel):
+class ResourcesConfig(_ConfigModel):
     count: int
     update_rate: float
 
 
 # ---------- кеш-стратегии ----------
-class FixedTTLConfig(BaseModel):
+class FixedTTLConfig(_ConfigModel):
     ttl: float
 
 
-class AdaptiveTTLConfig(BaseModel):
+class AdaptiveTTLConfig(_ConfigModel):
     theta: float
     recalc_interval: float
 
 
-class HybridConfig(BaseModel):
+class HybridConfig(_ConfigModel):
     # реактивная часть (адаптивный TTL)
     # предиктивная часть:
     history_window: float  # за какой интервал собираем историю
@@ -78,7 +122,7 @@ class HybridConfig(BaseModel):
     k: float  # коэффициент для P_pred
 
 
-class CacheConfig(BaseModel):
+class CacheConfig(_ConfigModel):
     strategy: Literal["fixed_ttl", "adaptive_ttl", "hybrid_predictive"]
     fixed_ttl: FixedTTLConfig
     adaptive_ttl: AdaptiveTTLConfig
@@ -86,11 +130,12 @@ class CacheConfig(BaseModel):
 
 
 # ---------- вывод ----------
-class OutputConfig(BaseModel):
+class OutputConfig(_ConfigModel):
     path: str
+    stream_events: bool = False  # события — в <path>_<время>.events.ndjson, а не в JSON
 
 
-class Settings(BaseModel):
+class Settings(_ConfigModel):
     logging: LoggingConfig
     simulator: SimulatorConfig
     external_source: ExternalSourceConfig
@@ -101,7 +146,31 @@ class Settings(BaseModel):
     # загрузка из YAML
     @classmethod
     def load(cls, path: str | None = None) -> "Settings":
+        """
+        Загрузка с полной валидацией. Результат кешируется по (путь, mtime, размер):
+        повторные вызовы для неизменённого файла возвращают тот же объект,
+        поэтому настройки следует считать неизменяемыми.
+        """
+        yaml_path = os.path.realpath(path or os.getenv("CONFIG_PATH", "config/default.yaml"))
+        st = os.stat(yaml_path)
+        return _load_validated(cls, yaml_path, st.st_mtime_ns, st.st_size)
+
+    @classmethod
+    def load_trusted(cls, path: str | None = None) -> "Settings":
+        """
+        Загрузка без валидации pydantic — для доверенных (локальных) конфигов.
+        Ошибки в YAML здесь всплывут только при использовании полей,
+        поэтому проверять конфиг следует через `load` (`--validate-config`).
+        """
         yaml_path = path or os.getenv("CONFIG_PATH", "config/default.yaml")
         with open(yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-        return cls.parse_obj(data)
+            data = yaml.load(f, Loader=_SafeLoader)
+        return _construct(cls, data)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_validated(cls: Type[Settings], yaml_path: str, mtime_ns: int, size: int) -> Settings:
+    """Разбор и валидация YAML; mtime_ns и size входят в ключ кеша `Settings.load`."""
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_SafeLoader)
+    return cls.model_validate(data)
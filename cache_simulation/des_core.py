@@ -0,0 +1,95 @@
+# cache_simulation/des_core.py
+
+"""
+Облегчённое ядро дискретно-событийной симуляции поверх SimPy.
+
+`MicroEnv` — это `simpy.Environment` (process/timeout/event работают как
+прежде, поэтому кеш с консолидацией fetch-ей и стратегии не меняются),
+к которому добавлены:
+
+* `call_later(delay, fn, *args)` — вызов функции через delay без
+  генератора и Process: в общую кучу событий кладётся лёгкий объект
+  `_Call`, а не Timeout, который ещё и будил бы процесс. Так устроены
+  периодические «тики» — поток заявок клиентов, воспроизведение
+  обновлений источника, пересчёт TTL;
+* `run(until=<число>)` — цикл обработки событий без вызова `step()` и
+  try/except на каждое событие. Порядок событий тот же, что у SimPy.
+"""
+
+from heapq import heappop
+from typing import Any, Callable
+
+import simpy
+from simpy.events import NORMAL, URGENT
+
+
+class _Call:
+    """Запланированный вызов fn(*args); для цикла событий выглядит как сработавшее событие."""
+
+    __slots__ = ("callbacks", "_fn", "_args")
+
+    _ok = True
+
+    def __init__(self, fn: Callable[..., Any], args: tuple):
+        self.callbacks = [_Call._fire]
+        self._fn = fn
+        self._args = args
+
+    def _fire(self) -> None:
+        self._fn(*self._args)
+
+
+class MicroEnv(simpy.Environment):
+    """simpy.Environment с дешёвыми отложенными вызовами и быстрым run()."""
+
+    def call_later(self, delay: float, fn: Callable[..., Any], *args: Any) -> None:
+        """Вызвать fn(*args) в момент now + delay (приоритет обычного Timeout)."""
+        self.schedule(_Call(fn, args), NORMAL, delay)
+
+    def run(self, until=None):
+        """
+        Для числового until — собственный цикл, эквивалентный SimPy: маркер
+        окончания ставится с приоритетом URGENT, как в `Environment.run`.
+        Остальные формы until обрабатывает базовая реализация.
+        """
+        if until is None or isinstance(until, simpy.Event):
+            return super().run(until)
+
+        at = until if isinstance(until, int) else float(until)
+        if at <= self._now:
+            raise ValueError(f"until ({at}) must be greater than the current simulation time")
+        stop = simpy.Event(self)
+        stop._ok = True
+        stop._value = None
+        self.schedule(stop, URGENT, at - self._now)
+
+        # маркер лежит в очереди, пока не извлечён, поэтому она не опустеет раньше
+        queue = self._queue
+        while True:
+            self._now, _, _, event = heappop(queue)
+            if event is stop:
+                return None
+
+            callbacks, event.callbacks = event.callbacks, None
+            for callback in callbacks:
+                callback(event)
+
+            if not event._ok and not hasattr(event, "_defused"):
+                exc = type(event._value)(*event._value.args)
+                exc.__cause__ = event._value
+                raise exc
+
+
+def scheduler(env: simpy.Environment) -> Callable[..., None]:
+    """
+    Функция call_later(delay, fn, *args) для env: `env.call_later` у MicroEnv,
+    для обычного simpy.Environment — Timeout с обратным вызовом (так классы
+    работают и на чистом SimPy, например в тестах).
+    """
+    if isinstance(env, MicroEnv):
+        return env.call_later
+
+    def call_later(delay: float, fn: Callable[..., Any], *args: Any) -> None:
+        env.timeout(delay).callbacks.append(lambda _event: fn(*args))
+
+    return call_later
@@ -1,18 +1,39 @@
 # cache_simulation/external_source.py
 
+import logging
 import math
 import random
-from typing import Optional
+from typing import List, Optional, Tuple
 
+import numpy as np
 import simpy
 
+from cache_simulation.des_core import scheduler
 from cache_simulation.logger import get_logger
 from cache_simulation.metrics import MetricsCollector
+from cache_simulation.sampling import sinusoid_interval
 
 logger = get_logger(__name__)
 
+# сколько случайных величин (интервалов обновлений, времён обслуживания)
+# генерируется за одно обращение к NumPy
+_SAMPLE_BATCH = 4096
+
+
+def _discard(row) -> None:
+    """Заглушка добавления строки метрик, когда MetricsCollector не задан."""
+
 
 class ExternalSource:
+    """
+    Внешний источник данных: обновляет ресурсы и обслуживает запросы через
+    общую FIFO-очередь с одним сервером.
+
+    Обновления и вызовы источника копятся внутри и попадают в MetricsCollector
+    только в flush_metrics(): до этого вызова metrics.source_updates и
+    metrics.source_calls пусты. Без metrics строки не копятся вовсе.
+    """
+
     def __init__(
             self,
             env: simpy.Environment,
@@ -24,13 +45,45 @@ class ExternalSource:
             cycle_period: float = None,
             cycle_amplitude: float = None,
             peak_phase: float = None,
+            horizon: Optional[float] = None,
+            rng: Optional[random.Random] = None,
     ):
+        """
+        :param horizon: момент окончания симуляции. Если задан, моменты всех
+            обновлений до horizon генерируются заранее (векторно) и
+            воспроизводятся одним процессом; иначе у каждого ресурса свой
+            бесконечный процесс-генератор обновлений.
+        :param rng: источник случайности симуляции, из которого сидируется
+            генератор NumPy (по умолчанию — глобальный `random`).
+        """
         self.env = env
         self.min_service = min_service
         self.max_service = max_service
         self.resources = resources
         self.metrics = metrics
-        self.server = simpy.Resource(env, capacity=1)
+        # уровень логирования фиксируется при создании: на каждом обновлении и
+        # вызове проверяется атрибут, а не вызывается isEnabledFor
+        self._info = logger.isEnabledFor(logging.INFO)
+        # общая FIFO-очередь с одним сервером: момент, когда сервер освободится
+        self._busy_until = env.now
+        self._rng = np.random.default_rng((rng or random).getrandbits(64))
+        self._service_times = iter(())
+        self._call_later = scheduler(env)
+        # строки метрик копятся здесь и передаются в MetricsCollector в flush_metrics();
+        # без metrics добавление строки — пустая функция, и списки не растут
+        self._update_rows: List[Tuple[str, float, int]] = []
+        self._call_rows: List[Tuple[str, float, float]] = []
+        if metrics:
+            self._add_update_row = self._update_rows.append
+            self._add_call_row = self._call_rows.append
+        else:
+            self._add_update_row = self._add_call_row = _discard
+
+        if horizon is not None:
+            times, owners = self.pregenerate(
+                horizon, update_pattern, cycle_period, cycle_amplitude, peak_phase)
+            self._replay_updates(times, owners)
+            return
 
         # Запускаем фоновые обновления для каждого ресурса
         for res in self.resources:
@@ -40,55 +93,144 @@ class ExternalSource:
             else:
                 self.env.process(self._update_generator_poisson(res))
 
+    # ------------------------------------------------------------------ #
+    #   Заранее сгенерированная шкала обновлений                         #
+    # ------------------------------------------------------------------ #
+    def pregenerate(self, horizon, update_pattern="poisson", P=None, A=None, φ=None):
+        """
+        Моменты всех обновлений всех ресурсов на [env.now, horizon].
+
+        Обновления не зависят от состояния кеша, поэтому поток можно
+        сгенерировать целиком: кумулятивные суммы экспоненциальных интервалов,
+        а для циклического шаблона — векторный thinning с интенсивностью
+        λ0·(1 + A·sin(2π(t − φ)/P)). Здесь thinning дешевле обращения Λ(t):
+        отбраковка идёт одной векторной операцией, а метод Ньютона
+        последователен по событиям.
+        Возвращает (times, owners) — отсортированные моменты и индексы ресурсов.
+        """
+        cyclic = update_pattern == "cyclic"
+        all_times, all_owners = [], []
+        for idx, res in enumerate(self.resources):
+            λ0 = res.update_rate
+            if λ0 <= 0.0:
+                continue
+            λmax = λ0 * (1 + A) if cyclic else λ0
+            t = self.env.now
+            while t < horizon:
+                # с запасом, чтобы обычно хватало одной пачки
+                n = int((horizon - t) * λmax * 1.2) + 16
+                ts = t + np.cumsum(self._rng.exponential(1.0 / λmax, n))
+                t = ts[-1]
+                if cyclic:
+                    accept = self._rng.random(n) <= (1.0 + A * np.sin(2.0 * math.pi * (ts - φ) / P)) / (1 + A)
+                    ts = ts[accept]
+                ts = ts[ts <= horizon]
+                all_times.append(ts)
+                all_owners.append(np.full(ts.shape[0], idx, dtype=np.intp))
+
+        if not all_times:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+        times = np.concatenate(all_times)
+        owners = np.concatenate(all_owners)
+        order = np.argsort(times, kind="stable")
+        return times[order], owners[order]
+
+    def _replay_updates(self, times, owners) -> None:
+        """
+        Применить заранее сгенерированные обновления: цепочка отложенных
+        вызовов, по одному в куче событий (вместо процесса с Timeout-ами).
+        """
+        delays = np.diff(times, prepend=self.env.now)
+        self._replay = zip(delays.tolist(), owners.tolist())
+        self._next_update()
+
+    def _next_update(self) -> None:
+        for delay, idx in self._replay:
+            self._call_later(delay, self._apply_update, self.resources[idx])
+            return
+
+    def _apply_update(self, resource) -> None:
+        resource.version += 1
+        if self._info:
+            logger.info("t=%.2f: %s updated to v=%d", self.env.now, resource.name, resource.version)
+        self._add_update_row((resource.name, self.env.now, resource.version))
+        self._next_update()
+
+    # ------------------------------------------------------------------ #
+    #   Бесконечные генераторы обновлений (без horizon)                  #
+    # ------------------------------------------------------------------ #
     def _update_generator_poisson(self, resource):
+        scale = 1.0 / resource.update_rate
         while True:
-            tau = random.expovariate(resource.update_rate)
-            yield self.env.timeout(tau)
-            resource.version += 1
-            logger.info(f"t={self.env.now:.2f}: {resource} updated to v={resource.version}")
-            if self.metrics:
-                self.metrics.record_source_update(resource, self.env.now)
+            for tau in self._rng.exponential(scale, _SAMPLE_BATCH).tolist():
+                yield self.env.timeout(tau)
+                resource.version += 1
+                if self._info:
+                    logger.info("t=%.2f: %s updated to v=%d", self.env.now, resource.name, resource.version)
+                self._add_update_row((resource.name, self.env.now, resource.version))
 
     def _update_generator_cyclic(self, resource, P, A, φ):
+        """
+        Обновления с интенсивностью λ(t) = λ0·(1 + A·sin(2π(t − φ)/P)), 0 ≤ A ≤ 1.
+        Без thinning: каждое Exp(1) обращается через интегральную интенсивность
+        (sinusoid_interval), т.е. одна случайная величина на обновление.
+        """
         λ0 = resource.update_rate
-        λmax = λ0 * (1 + A)
+        omega = 2.0 * math.pi / P
+        amp = λ0 * A
+        timeout = self.env.timeout
         t_cur = self.env.now
         while True:
-            # thinning: ждём кандидата
-            tau = random.expovariate(λmax)
-            t_cur += tau
-            # момент с проверкой принятия
-            lam_t = λ0 * (1 + A * math.sin(2 * math.pi * (t_cur - φ) / P))
-            if random.random() <= lam_t / λmax:
-                yield self.env.timeout(tau)
+            for u in self._rng.exponential(1.0, _SAMPLE_BATCH).tolist():
+                tau = sinusoid_interval(t_cur - φ, u, λ0, amp, omega)
+                yield timeout(tau)
+                t_cur += tau
                 resource.version += 1
-                if self.metrics:
-                    self.metrics.record_source_update(resource, self.env.now)
-            else:
-                # отклонили — просто двигаем время
-                yield self.env.timeout(tau)
+                self._add_update_row((resource.name, self.env.now, resource.version))
+
+    def flush_metrics(self) -> None:
+        """
+        Передать накопленные обновления и вызовы источника в MetricsCollector
+        (вызывается в конце симуляции).
+        """
+        if self.metrics:
+            self.metrics.ingest_source_updates(self._update_rows)
+            self.metrics.ingest_source_calls(self._call_rows)
+        self._update_rows.clear()
+        self._call_rows.clear()
 
     def request(self, resource):
         """
         Обслуживает запрос клиента на конкретный Resource через общую очередь.
-        Возвращает (value, version).
+        Возвращает генератор с результатом (value, version): выполняется через
+        `yield from` внутри процесса вызывающего, либо `env.process(...)`,
+        если нужен отдельный процесс.
         """
-        return self.env.process(self._request_proc(resource))
+        return self._request_proc(resource)
+
+    def _next_service_time(self) -> float:
+        try:
+            return next(self._service_times)
+        except StopIteration:
+            batch = self._rng.uniform(self.min_service, self.max_service, _SAMPLE_BATCH)
+            self._service_times = iter(batch.tolist())
+            return next(self._service_times)
 
     def _request_proc(self, resource):
         arr = self.env.now
-        # общая очередь
-        with self.server.request() as req:
-            yield req
-            service_time = random.uniform(self.min_service, self.max_service)
-            yield self.env.timeout(service_time)
+        # общая очередь: обслуживание начнётся, когда сервер освободится от
+        # запросов, пришедших раньше, поэтому момент окончания известен сразу
+        # и ожидание в очереди + обслуживание — один таймаут
+        finish = max(arr, self._busy_until) + self._next_service_time()
+        self._busy_until = finish
+        yield self.env.timeout(finish - arr)
 
         finish = self.env.now
-        wait = finish - arr
-        logger.info(f"t={finish:.2f}: Served {resource}, v={resource.version}, wait={wait:.2f}")
+        if self._info:
+            logger.info("t=%.2f: Served %s, v=%d, wait=%.2f",
+                        finish, resource.name, resource.version, finish - arr)
 
-        if self.metrics:
-            self.metrics.record_source_call(resource, arr, finish)
+        self._add_call_row((resource.name, arr, finish))
 
         value = f"data_for_{resource.name}"
         return value, resource.version
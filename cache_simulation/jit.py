@@ -0,0 +1,29 @@
+# cache_simulation/jit.py
+
+"""
+Необязательная JIT-компиляция числовых ядер через Numba.
+
+Numba не входит в обязательные зависимости: если пакет не установлен,
+декоратор `njit` возвращает функцию без изменений и ядро работает как
+обычный Python. Поэтому под `@njit` выносятся только «чистые» числовые
+функции без SimPy, логирования и глобального `random`.
+"""
+
+try:
+    from numba import njit as _numba_njit
+except ImportError:  # pragma: no cover - зависит от окружения
+    _numba_njit = None
+
+HAS_NUMBA = _numba_njit is not None
+
+
+def njit(*args, **kwargs):
+    """
+    `numba.njit`, если Numba доступна, иначе тождественный декоратор.
+    Поддерживает обе формы: `@njit` и `@njit(cache=True, ...)`.
+    """
+    if HAS_NUMBA:
+        return _numba_njit(*args, **kwargs)
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+    return lambda fn: fn
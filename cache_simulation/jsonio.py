@@ -0,0 +1,32 @@
+# cache_simulation/jsonio.py
+
+"""
+Необязательная быстрая JSON-сериализация через orjson.
+
+orjson не входит в обязательные зависимости: если пакет не установлен,
+используется стандартный `json` с теми же настройками (UTF-8 без
+экранирования, отступ 2 при indent=True). Обе ветки возвращают bytes.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+# размер буфера файла экспорта: крупные записи вместо множества мелких
+EXPORT_BUFFER_SIZE = 1 << 23
+
+if HAS_ORJSON:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Сериализовать obj в JSON (bytes, UTF-8)."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=_OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
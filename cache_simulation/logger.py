@@ -1,13 +1,26 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 
 from cache_simulation.config import Settings
 
+# фоновый поток, в котором записи форматируются и пишутся в консоль/файл,
+# и обработчик root-логгера, кладущий записи в его очередь
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
 
 def setup_logging(settings: Settings):
     """
     Настройка логгера на основе pydantic-модели Settings.logging.
+
+    Поток симуляции только кладёт записи в очередь (QueueHandler);
+    форматирование и запись в консоль/файл выполняет QueueListener
+    в отдельном потоке.
     """
+    global _listener, _queue_handler
     log_cfg = settings.logging
 
     # уровни
@@ -21,7 +34,6 @@ def setup_logging(settings: Settings):
     ch = logging.StreamHandler()
     ch.setLevel(console_level)
     ch.setFormatter(logging.Formatter(log_cfg.console.fmt, datefmt=log_cfg.date_format))
-    root.addHandler(ch)
 
     # файл с ротацией
     fh = RotatingFileHandler(
@@ -32,7 +44,29 @@ def setup_logging(settings: Settings):
     )
     fh.setLevel(file_level)
     fh.setFormatter(logging.Formatter(log_cfg.file.fmt, datefmt=log_cfg.date_format))
-    root.addHandler(fh)
+
+    # повторный вызов: заменяем прежнюю очередь (прежний поток её дописывает)
+    shutdown_logging()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, ch, fh, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописать оставшиеся в очереди записи и остановить фоновый поток."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -1,11 +1,89 @@
-# заменяем весь файл; добавлены метрики ttl_changes и метод record_ttl_change
-from statistics import mean
-from typing import Any, Dict, List, Optional
+# cache_simulation/metrics.py
 
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from cache_simulation.jsonio import EXPORT_BUFFER_SIZE, dumps
 from cache_simulation.logger import get_logger
 
 logger = get_logger(__name__)
 
+# ---- коды строк для MetricsCollector.ingest_event_row ----
+HIT_CORRECT = 0
+HIT_INCORRECT = 1
+MISS = 2
+STALE_INITIAL = 3
+STALE_REPEAT = 4
+
+_ROW_TYPES = ("hit_correct", "hit_incorrect", "miss", "stale_initial", "stale_repeat")
+
+
+def output_stem(path: str) -> str:
+    """
+    База имён выходных файлов (строка): path без расширения. Родительский
+    каталог создаётся здесь; имена файлов дальше получаются конкатенацией
+    (stem + ".json", stem + ".csv", …) без объектов PurePath.
+    """
+    stem = str(Path(path).with_suffix(""))
+    Path(stem).parent.mkdir(parents=True, exist_ok=True)
+    return stem
+
+
+# ---- «сырые» записи ----
+# во время прогона хранятся простыми кортежами (литерал кортежа в разы дешевле
+# dict и ~3 раза компактнее); в словари превращаются только в summary()
+def _event_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """(time, event, key, cache_size)"""
+    return [{"time": t, "event": e, "key": k, "cache_size": n} for t, e, k, n in rows]
+
+
+def _cache_call_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """(key, start, finish, type, version)"""
+    return [
+        {"key": k, "start": s, "finish": f, "type": c, "version": v}
+        for k, s, f, c, v in rows
+    ]
+
+
+def _source_call_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """(resource, start, finish, latency)"""
+    return [
+        {"resource": r, "start": s, "finish": f, "latency": lat}
+        for r, s, f, lat in rows
+    ]
+
+
+def _source_update_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """(resource, time, new_version)"""
+    return [{"resource": r, "time": t, "new_version": v} for r, t, v in rows]
+
+
+def _ttl_change_dicts(rows: List[tuple]) -> List[Dict[str, float]]:
+    """(time, ttl)"""
+    return [{"time": t, "ttl": v} for t, v in rows]
+
+
+def _profile_dicts(rows: List[tuple]) -> List[Dict[str, float]]:
+    """(time, period, bin, p)"""
+    return [{"time": t, "period": T, "bin": b, "p": p} for t, T, b, p in rows]
+
+
+def _floats(values: array) -> List[float]:
+    return values.tolist()
+
+
+def _as_is(rows: list) -> list:
+    return rows
+
+
+# сколько записей детального лога сериализуется за один вызов в write_json()
+_WRITE_CHUNK = 10_000
+
+# при потоковой записи событий: сколько событий копится в памяти до сброса в файл
+_EVENT_SPILL_SIZE = 100_000
+
 
 class MetricsCollector:
     """
@@ -14,44 +92,79 @@ class MetricsCollector:
     Расширено:
     ----------
     * ttl_changes – динамика изменения TTL адаптивной стратегии.
+    * events_path – если задан, события (`events`) не копятся в памяти,
+      а построчно пишутся в этот файл в формате NDJSON.
     """
 
-    def __init__(self):
+    __slots__ = (
+        "miss_times", "correct_hits", "incorrect_hits",
+        "_miss_sum", "_correct_hit_sum", "_incorrect_hit_sum",
+        "stale_initial", "stale_repeat", "cache_updates", "redundant_misses", "_updates_by_res",
+        "hit_entry_ages", "stale_entry_ages", "events", "source_calls", "source_updates",
+        "cache_calls", "ttl_changes", "prefetch_events", "detected_periods", "profile_scores",
+        "_events_fp", "_events_spilled", "_push_event", "_summary_key", "_summary",
+    )
+
+    def __init__(self, events_path: Optional[str] = None):
         # ---- задержки ----
-        self.miss_times: List[float] = []
-        self.correct_hits: List[float] = []
-        self.incorrect_hits: List[float] = []
+        # числовые ряды — компактные array('d') (8 байт на значение вместо
+        # указателя и отдельного float-объекта); в списки — только в summary()
+        self.miss_times: array = array("d")
+        self.correct_hits: array = array("d")
+        self.incorrect_hits: array = array("d")
+        # суммы задержек ведутся на лету: средние в summary() без прохода по спискам
+        self._miss_sum: float = 0.0
+        self._correct_hit_sum: float = 0.0
+        self._incorrect_hit_sum: float = 0.0
 
         # ---- счётчики событий ----
         self.stale_initial: int = 0
         self.stale_repeat: int = 0
         self.cache_updates: int = 0
         self.redundant_misses: int = 0
+        # обновления источника по ресурсам — считаются при записи, а не в сводке
+        self._updates_by_res: Counter = Counter()
 
         # ---- «сырые» данные ----
-        self.hit_entry_ages: List[float] = []
-        self.stale_entry_ages: List[float] = []
-        self.events: List[Dict[str, Any]] = []
-        self.source_calls: List[Dict[str, Any]] = []
-        self.source_updates: List[Dict[str, Any]] = []
-        self.cache_calls: List[Dict[str, Any]] = []
-        self.ttl_changes: List[Dict[str, float]] = []
+        self.hit_entry_ages: array = array("d")
+        self.stale_entry_ages: array = array("d")
+        # кортежи; состав полей — в _event_dicts, _source_call_dicts и т.д.
+        self.events: List[tuple] = []
+        self.source_calls: List[tuple] = []
+        self.source_updates: List[tuple] = []
+        self.cache_calls: List[tuple] = []
+        self.ttl_changes: List[tuple] = []
 
         self.prefetch_events: List[Dict[str, Any]] = []
         self.detected_periods: List[Dict[str, Any]] = []
-        self.profile_scores: List[Dict[str, Any]] = []
+        self.profile_scores: List[tuple] = []
+
+        # последняя сводка и «отпечаток» состояния, для которого она посчитана
+        self._summary_key: Optional[tuple] = None
+        self._summary: Optional[dict] = None
+
+        # куда уходят события: в список self.events или в NDJSON-файл
+        self._events_fp = None
+        self._events_spilled = 0
+        self._push_event = self.events.append
+        if events_path is not None:
+            self._events_fp = open(events_path, "wb", buffering=1 << 20)
+            self._push_event = self._buffer_event
 
     # ------------------------------------------------------------------ #
     #   Методы‑регистраторы                                              #
     # ------------------------------------------------------------------ #
     def record_miss(self, wait_time: float):
         self.miss_times.append(wait_time)
+        self._miss_sum += wait_time
 
     def record_correct_hit(self, wait_time: float):
         self.correct_hits.append(wait_time)
+        self._correct_hit_sum += wait_time
 
     def record_incorrect_hit(self, wait_time: float):
         self.incorrect_hits.append(wait_time)
+        self._incorrect_hit_sum += wait_time
 
     def record_stale_initial(self):
         self.stale_initial += 1
@@ -79,15 +192,7 @@ class MetricsCollector:
             call_type: str,
             version: int,
     ):
-        self.cache_calls.append(
-            {
-                "key": str(key),
-                "start": start,
-                "finish": finish,
-                "type": call_type,
-                "version": version,
-            }
-        )
+        self.cache_calls.append((str(key), start, finish, call_type, version))
 
     def record_prefetch(self, time: float, resource: str):
         self.prefetch_events.append({"time": time, "resource": resource})
@@ -96,46 +201,102 @@ class MetricsCollector:
         self.detected_periods.append({"time": time, "periods": periods})
 
     def record_profile(self, time: float, period: float, bin_start: float, p: float):
-        self.profile_scores.append({
-            "time": time,
-            "period": period,
-            "bin": bin_start,
-            "p": p
-        })
+        self.profile_scores.append((time, period, bin_start, p))
+
+    def ingest_profile(self, time: float, period: float, bin_starts: List[float], ps: List[float]):
+        """Пакетная запись профиля одного периода: вероятности p по началам бинов."""
+        self.profile_scores.extend((time, period, b, p) for b, p in zip(bin_starts, ps))
+
+    def _buffer_event(self, rec: tuple) -> None:
+        events = self.events
+        events.append(rec)
+        if len(events) >= _EVENT_SPILL_SIZE:
+            self._spill_events()
+
+    def _spill_events(self) -> None:
+        """Сбросить накопленные события в NDJSON-файл одной записью и очистить буфер."""
+        if self.events:
+            self._events_fp.write(b"".join(dumps(d) + b"\n" for d in _event_dicts(self.events)))
+            self._events_spilled += len(self.events)
+            self.events.clear()
+
+    def close(self) -> None:
+        """Дописать и закрыть NDJSON-файл событий (если события пишутся в файл)."""
+        if self._events_fp is not None:
+            self._spill_events()
+            self._events_fp.close()
+            self._events_fp = None
 
     def record_event(self, time: float, event_type: str, key: Any, cache_size: int):
-        self.events.append(
-            {
-                "time": time,
-                "event": event_type,
-                "key": str(key) if key is not None else None,
-                "cache_size": cache_size,
-            }
-        )
+        self._push_event((time, event_type, str(key) if key is not None else None, cache_size))
 
     def record_source_call(self, resource, start: float, finish: float):
-        self.source_calls.append(
-            {
-                "resource": resource.name,
-                "start": start,
-                "finish": finish,
-                "latency": finish - start,
-            }
-        )
+        self.source_calls.append((resource.name, start, finish, finish - start))
 
     def record_source_update(self, resource, time: float):
-        self.source_updates.append(
-            {
-                "resource": resource.name,
-                "time": time,
-                "new_version": resource.version,
-            }
+        self.source_updates.append((resource.name, time, resource.version))
+        self._updates_by_res[resource.name] += 1
+
+    def ingest_source_updates(self, rows: List[Tuple[str, float, int]]):
+        """Пакетная запись обновлений источника: строки (resource, time, new_version)."""
+        self.source_updates.extend(rows)
+        self._updates_by_res.update(row[0] for row in rows)
+
+    def ingest_source_calls(self, rows: List[Tuple[str, float, float]]):
+        """Пакетная запись вызовов источника: строки (resource, start, finish)."""
+        self.source_calls.extend(
+            (name, start, finish, finish - start) for name, start, finish in rows
         )
 
+    def ingest_event_row(
+            self,
+            kind: int,
+            now: float,
+            wait: float,
+            age: float,
+            key: Any,
+            cache_size: int,
+            version: Optional[int],
+            finish: Optional[float] = None,
+    ):
+        """
+        Одна строка метрик вместо серии вызовов record_* на горячем пути кеша.
+
+        * HIT_CORRECT / HIT_INCORRECT — возраст записи, время ожидания, событие
+          и cache_call (now → finish);
+        * STALE_INITIAL / STALE_REPEAT — возраст записи, счётчик и событие;
+        * MISS — завершение промаха: время ожидания и cache_call (now → finish);
+          само событие «miss» фиксируется в момент обращения через record_event.
+        """
+        call_type = _ROW_TYPES[kind]
+        str_key = str(key)
+        if kind == MISS:
+            self.miss_times.append(wait)
+            self._miss_sum += wait
+        else:
+            if kind == HIT_CORRECT:
+                self.hit_entry_ages.append(age)
+                self.correct_hits.append(wait)
+                self._correct_hit_sum += wait
+            elif kind == HIT_INCORRECT:
+                self.hit_entry_ages.append(age)
+                self.incorrect_hits.append(wait)
+                self._incorrect_hit_sum += wait
+            else:
+                self.stale_entry_ages.append(age)
+                if kind == STALE_INITIAL:
+                    self.stale_initial += 1
+                else:
+                    self.stale_repeat += 1
+                finish = None
+            self._push_event((now, call_type, str_key, cache_size))
+        if finish is not None:
+            self.cache_calls.append((str_key, now, finish, call_type, version))
+
     # ---------- НОВОЕ ----------
     def record_ttl_change(self, time: float, ttl: float):
         """Фиксируем момент смены TTL адаптивной стратегии."""
-        self.ttl_changes.append({"time": time, "ttl": ttl})
+        self.ttl_changes.append((time, ttl))
 
     # ------------------------------------------------------------------ #
     #   Сводка результатов                                               #
@@ -143,7 +304,8 @@ class MetricsCollector:
     def collect_from(self, simulator) -> None:
         self.record_event(simulator.env.now, "final_cache_size", None, len(simulator.cache))
 
-    def summary(self) -> dict:
+    def aggregate_summary(self) -> Dict[str, Any]:
+        """Только скалярные агрегаты и счётчики — без подробных логов, O(число ресурсов)."""
         correct = len(self.correct_hits)
         incorrect = len(self.incorrect_hits)
         misses = len(self.miss_times)
@@ -153,13 +315,7 @@ class MetricsCollector:
         correct_rate = correct / (correct + incorrect) if (correct + incorrect) else 0.0
         miss_rate = misses / total if total else 0.0
 
-        updates_by_res: Dict[str, int] = {}
-        for rec in self.source_updates:
-            updates_by_res.setdefault(rec["resource"], 0)
-            updates_by_res[rec["resource"]] += 1
-
-        data = {
-            # агрегаты
+        return {
             "total_requests": total,
             "correct_hits": correct,
             "incorrect_hits": incorrect,
@@ -169,28 +325,106 @@ class MetricsCollector:
             "miss_rate": miss_rate,
             "cache_updates": self.cache_updates,
             "redundant_misses": self.redundant_misses,
-            "avg_correct_hit_time": mean(self.correct_hits) if self.correct_hits else None,
-            "avg_incorrect_hit_time": mean(self.incorrect_hits) if self.incorrect_hits else None,
-            "avg_miss_time": mean(self.miss_times) if self.miss_times else None,
+            "avg_correct_hit_time": self._correct_hit_sum / correct if correct else None,
+            "avg_incorrect_hit_time": self._incorrect_hit_sum / incorrect if incorrect else None,
+            "avg_miss_time": self._miss_sum / misses if misses else None,
             "stale_initial": self.stale_initial,
             "stale_repeat": self.stale_repeat,
             "source_calls": len(self.source_calls),
-            "updates_by_resource": updates_by_res,
+            "updates_by_resource": dict(self._updates_by_res),
             "total_source_updates": len(self.source_updates),
-            # подробные логи
-            "events": self.events,
-            "cache_calls_detail": self.cache_calls,
-            "source_calls_detail": self.source_calls,
-            "source_updates_detail": self.source_updates,
-            "hit_entry_ages": self.hit_entry_ages,
-            "stale_entry_ages": self.stale_entry_ages,
-            "ttl_changes": self.ttl_changes,
-            "prefetch_events": self.prefetch_events,
-            "detected_periods": self.detected_periods,
-            "profile_scores": self.profile_scores,
         }
+
+    def _details(self):
+        """Подробные логи: (имя в сводке, сырые записи, преобразование в JSON-вид)."""
+        return (
+            # при потоковой записи в памяти лишь несброшенный хвост — в сводку не идёт
+            ("events", self.events if self._events_fp is None else [], _event_dicts),
+            ("cache_calls_detail", self.cache_calls, _cache_call_dicts),
+            ("source_calls_detail", self.source_calls, _source_call_dicts),
+            ("source_updates_detail", self.source_updates, _source_update_dicts),
+            ("hit_entry_ages", self.hit_entry_ages, _floats),
+            ("stale_entry_ages", self.stale_entry_ages, _floats),
+            ("ttl_changes", self.ttl_changes, _ttl_change_dicts),
+            ("prefetch_events", self.prefetch_events, _as_is),
+            ("detected_periods", self.detected_periods, _as_is),
+            ("profile_scores", self.profile_scores, _profile_dicts),
+        )
+
+    def _state_key(self) -> tuple:
+        """
+        O(1)-отпечаток состояния: все регистраторы только дописывают в списки
+        или увеличивают счётчики, поэтому любая новая запись меняет отпечаток.
+        """
+        return (
+            len(self.miss_times), len(self.correct_hits), len(self.incorrect_hits),
+            self.stale_initial, self.stale_repeat, self.cache_updates, self.redundant_misses,
+            len(self.hit_entry_ages), len(self.stale_entry_ages),
+            self._events_spilled + len(self.events),
+            len(self.source_calls), len(self.source_updates), len(self.cache_calls),
+            len(self.ttl_changes), len(self.prefetch_events), len(self.detected_periods),
+            len(self.profile_scores),
+        )
+
+    def full_summary(self) -> dict:
+        """
+        Полная сводка (агрегаты и подробные логи). Пока новых записей нет,
+        повторные вызовы возвращают тот же (закешированный) словарь —
+        изменять его не следует.
+        """
+        key = self._state_key()
+        if self._summary is not None and key == self._summary_key:
+            return self._summary
+        data = self.aggregate_summary()
+        for name, rows, convert in self._details():
+            data[name] = convert(rows)
+        self._summary_key = key
+        self._summary = data
         return data
 
-    # экспорт (без изменений)
+    # прежнее имя: визуализатор и внешние скрипты получают полную сводку
+    summary = full_summary
+
+    def write_json(self, fp: BinaryIO, header: Dict[str, Any]) -> None:
+        """
+        Потоковая запись `{**header, "metrics": full_summary()}` в бинарный файл.
+        Подробные логи сериализуются пачками по _WRITE_CHUNK записей, поэтому
+        полная сводка со списками словарей в памяти не строится.
+        """
+        fp.write(b"{\n")
+        for name, value in header.items():
+            fp.write(b"%s: %s,\n" % (dumps(name), dumps(value, indent=True)))
+        fp.write(b'"metrics": {\n')
+        for name, value in self.aggregate_summary().items():
+            fp.write(b"  %s: %s,\n" % (dumps(name), dumps(value)))
+        details = self._details()
+        for i, (name, rows, convert) in enumerate(details):
+            fp.write(b"  %s: [" % dumps(name))
+            for start in range(0, len(rows), _WRITE_CHUNK):
+                if start:
+                    fp.write(b",")
+                fp.write(b"\n    ")
+                fp.write(dumps(convert(rows[start:start + _WRITE_CHUNK]))[1:-1])
+            fp.write(b"]\n" if i == len(details) - 1 else b"],\n")
+        fp.write(b"}\n}\n")
+
+    # экспорт
     def export(self, path: Optional[str]) -> None:
-        ...
+        """
+        Записать сводку в <path>.json (целиком) и <path>.csv (только скалярные
+        агрегаты: metric,value). CSV пишется напрямую строками — схема из двух
+        колонок фиксирована, модуль csv здесь не нужен.
+        """
+        if not path:
+            return
+        base = output_stem(path)
+        with open(base + ".json", "wb", buffering=EXPORT_BUFFER_SIZE) as jf:
+            jf.write(dumps(self.full_summary(), indent=True))
+
+        with open(base + ".csv", "w", encoding="utf-8", buffering=1 << 20) as cf:
+            cf.write("metric,value\n")
+            cf.writelines(
+                f"{k},{'' if v is None else v}\n"
+                for k, v in self.aggregate_summary().items() if not isinstance(v, dict)
+            )
+        logger.info("Metrics exported to %s(.json/.csv)", base)
@@ -10,7 +10,7 @@ class ResourceBase(ABC):
     с какой интенсивностью должен обновляться.
     """
 
-    __slots__ = ("name", "version")
+    __slots__ = ("name", "version", "_hash")
 
     def __init__(self, name: str):
         """
@@ -18,6 +18,8 @@ class ResourceBase(ABC):
         """
         self.name = name
         self.version = 0  # изначальная версия
+        # ресурс — ключ словарей кеша: хеш имени считаем один раз (имя не меняется)
+        self._hash = hash(name)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name}, v={self.version})"
@@ -26,7 +28,8 @@ class ResourceBase(ABC):
         return self.name
 
     def __eq__(self, other):
-        return isinstance(other, ResourceBase) and self.name == other.name
+        # ресурсы создаются один раз и переиспользуются: обычно это тот же объект
+        return self is other or (isinstance(other, ResourceBase) and self.name == other.name)
 
     def __hash__(self):
-        return hash(self.name)
+        return self._hash
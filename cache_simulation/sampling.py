@@ -0,0 +1,55 @@
+# cache_simulation/sampling.py
+
+"""
+Выборка моментов событий неоднородного пуассоновского потока с синусоидальной
+интенсивностью λ(t) = λ_base·(1 + A·sin ωt) — общая для циклических клиентов
+(CyclicClient) и циклических обновлений внешнего источника (ExternalSource).
+Сдвиг фазы φ учитывается вызывающим: интервал после момента t для
+sin(ω(t − φ)) — это интервал после момента t − φ.
+"""
+
+import math
+
+from cache_simulation.jit import njit
+
+# параметры метода Ньютона в sinusoid_interval
+_NEWTON_TOL = 1e-10
+_NEWTON_MAX_ITER = 50
+
+
+@njit(cache=True)
+def sinusoid_interval(t: float, u: float, lambda_base: float, amp_base: float, omega: float) -> float:
+    """
+    Интервал τ до следующего события пуассоновского потока с интенсивностью
+    λ(t) = λ_base + λ_base·A·sin(ωt), отвечающий экспоненциальной величине u.
+
+    Интегральная интенсивность Λ(t) = λ_base·t + (λ_base·A/ω)·(1 − cos ωt).
+    Решаем Λ(t + τ) − Λ(t) = u методом Ньютона (производная — это λ(t + τ)).
+    Приращение Λ считаем напрямую, а не разностью двух больших значений Λ,
+    чтобы не терять точность при больших t. Λ монотонна, а при A = 1 λ(t)
+    может обращаться в ноль, поэтому шаг Ньютона страхуется бисекцией внутри
+    вилки 0 ≤ τ ≤ (u + 2·λ_base·A/ω) / λ_base.
+
+    Чистое числовое ядро: компилируется Numba, если она установлена.
+    """
+    amp_int = amp_base / omega
+    cos_t = math.cos(omega * t)
+    lo = 0.0
+    hi = (u + 2.0 * amp_int) / lambda_base
+    tau = u / lambda_base
+
+    for _ in range(_NEWTON_MAX_ITER):
+        phase = omega * (t + tau)
+        g = lambda_base * tau + amp_int * (cos_t - math.cos(phase)) - u
+        if g > 0.0:
+            hi = tau
+        else:
+            lo = tau
+        rate = lambda_base + amp_base * math.sin(phase)
+        tau_next = tau - g / rate if rate > 0.0 else hi
+        if not (lo < tau_next < hi):
+            tau_next = 0.5 * (lo + hi)  # шаг вышел из вилки — бисекция
+        if abs(tau_next - tau) <= _NEWTON_TOL * tau_next:
+            return tau_next
+        tau = tau_next
+    return tau
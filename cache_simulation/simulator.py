@@ -1,26 +1,77 @@
 # cache_simulation/simulator.py
 
-import json
 import random
 from datetime import datetime
-from pathlib import Path
+from typing import Callable, Dict
 
+import numpy as np
 import simpy
 
 from cache_simulation.cache import Cache
 from cache_simulation.client import Client, CyclicClient
-from cache_simulation.config import Settings
+from cache_simulation.config import CacheConfig, Settings
+from cache_simulation.des_core import MicroEnv
 from cache_simulation.external_source import ExternalSource
+from cache_simulation.jsonio import EXPORT_BUFFER_SIZE
 from cache_simulation.logger import get_logger
-from cache_simulation.metrics import MetricsCollector
+from cache_simulation.metrics import MetricsCollector, output_stem
 from cache_simulation.resources.simple import SimpleResource
 from cache_simulation.strategies.adaptive import AdaptiveTTLStrategy
+from cache_simulation.strategies.base import CacheStrategy
 from cache_simulation.strategies.fixed_ttl import FixedTTLStrategy
 from cache_simulation.strategies.hybrid_predictive import HybridPredictiveStrategy
 
 logger = get_logger(__name__)
 
 
+# --------------------------------------------------------------------------- #
+#   Фабрики стратегий: cache.strategy → конструктор                          #
+# --------------------------------------------------------------------------- #
+def _fixed_ttl(cache_cfg: CacheConfig, env: simpy.Environment, metrics: MetricsCollector,
+               rng: random.Random) -> CacheStrategy:
+    return FixedTTLStrategy(ttl=cache_cfg.fixed_ttl.ttl)
+
+
+def _adaptive_ttl(cache_cfg: CacheConfig, env: simpy.Environment, metrics: MetricsCollector,
+                  rng: random.Random) -> CacheStrategy:
+    return AdaptiveTTLStrategy(
+        env=env,
+        metrics=metrics,
+        initial_ttl=cache_cfg.fixed_ttl.ttl,
+        theta=cache_cfg.adaptive_ttl.theta,
+        recalc_interval=cache_cfg.adaptive_ttl.recalc_interval,
+    )
+
+
+def _hybrid_predictive(cache_cfg: CacheConfig, env: simpy.Environment, metrics: MetricsCollector,
+                       rng: random.Random) -> CacheStrategy:
+    # базовая (реактивная) часть — адаптивный TTL, поверх неё — предиктивная
+    return HybridPredictiveStrategy(
+        env=env,
+        metrics=metrics,
+        base_strategy=_adaptive_ttl(cache_cfg, env, metrics, rng),
+        history_window=cache_cfg.hybrid.history_window,
+        analyze_interval=cache_cfg.hybrid.analyze_interval,
+        profile_bin_size=cache_cfg.hybrid.profile_bin_size,
+        prefetch_interval=cache_cfg.hybrid.prefetch_interval,
+        max_periods=cache_cfg.hybrid.max_periods,
+        k=cache_cfg.hybrid.k,
+        rng=rng,
+    )
+
+
+STRATEGY_REGISTRY: Dict[
+    str, Callable[[CacheConfig, simpy.Environment, MetricsCollector, random.Random], CacheStrategy]
+] = {
+    "fixed_ttl": _fixed_ttl,
+    "adaptive_ttl": _adaptive_ttl,
+    "hybrid_predictive": _hybrid_predictive,
+}
+
+# сколько индексов ресурсов для ключей запросов генерируется за одно обращение к NumPy
+_KEY_BATCH = 4096
+
+
 class Simulator:
     """
     Фасад симулятора: строит окружение, external source, cache с нужной стратегией,
@@ -29,11 +80,22 @@ class Simulator:
 
     def __init__(self, settings: Settings):
         self.cfg = settings
-        self.env = simpy.Environment()
-        self.metrics = MetricsCollector()
+        self.env = MicroEnv()
+
+        # база имён выходных файлов (строка): <output.path>_<время запуска>;
+        # каталог создаётся сразу — и для NDJSON-событий, и для итогового JSON
+        self._output_stem = None
+        events_path = None
+        if self.cfg.output and self.cfg.output.path:
+            stem = output_stem(self.cfg.output.path)
+            self._output_stem = f"{stem}_{datetime.now():%Y%m%d_%H%M%S}"
+            if self.cfg.output.stream_events:
+                events_path = self._output_stem + ".events.ndjson"
+        self.metrics = MetricsCollector(events_path=events_path)
 
-        # фиксируем seed для воспроизводимости
-        random.seed(self.cfg.simulator.random_seed)
+        # собственный генератор с фиксированным seed: воспроизводимость без
+        # глобального состояния `random` (независимые прогоны в одном процессе)
+        self.rng = random.Random(self.cfg.simulator.random_seed)
 
         # 1) Ресурсы
         self.resources = [
@@ -43,58 +105,28 @@ class Simulator:
 
         # 2) Внешний источник
         es = self.cfg.external_source
-        # Если в будущем понадобится циклический update_pattern — можно расширить ExternalSource
+        # шаблон обновлений выбирается один раз при создании источника
         self.source = ExternalSource(
             env=self.env,
             min_service=es.min_service,
             max_service=es.max_service,
             resources=self.resources,
             metrics=self.metrics,
-            update_pattern=getattr(es, "update_pattern", "poisson"),
-            cycle_period=getattr(es, "cycle_period", None),
-            cycle_amplitude=getattr(es, "cycle_amplitude", None),
-            peak_phase=getattr(es, "peak_phase", None),
+            update_pattern=es.update_pattern,
+            cycle_period=es.cycle_period,
+            cycle_amplitude=es.cycle_amplitude,
+            peak_phase=es.peak_phase,
+            horizon=self.cfg.simulator.sim_time,
+            rng=self.rng,
         )
 
         # 3) Стратегия кеширования
-        cache_cfg = self.cfg.cache
-        strat_name = cache_cfg.strategy
-
-        if strat_name == "fixed_ttl":
-            strategy = FixedTTLStrategy(ttl=cache_cfg.fixed_ttl.ttl)
-
-        elif strat_name == "adaptive_ttl":
-            strategy = AdaptiveTTLStrategy(
-                env=self.env,
-                metrics=self.metrics,
-                initial_ttl=cache_cfg.fixed_ttl.ttl,
-                theta=cache_cfg.adaptive_ttl.theta,
-                recalc_interval=cache_cfg.adaptive_ttl.recalc_interval,
-            )
-
-        elif strat_name == "hybrid_predictive":
-            # 3.1 базовая (реактивная) часть — адаптивный TTL
-            base = AdaptiveTTLStrategy(
-                env=self.env,
-                metrics=self.metrics,
-                initial_ttl=cache_cfg.fixed_ttl.ttl,
-                theta=cache_cfg.adaptive_ttl.theta,
-                recalc_interval=cache_cfg.adaptive_ttl.recalc_interval,
-            )
-            # 3.2 полная гибридно-предиктивная
-            strategy = HybridPredictiveStrategy(
-                env=self.env,
-                metrics=self.metrics,
-                base_strategy=base,
-                history_window=cache_cfg.hybrid.history_window,
-                analyze_interval=cache_cfg.hybrid.analyze_interval,
-                profile_bin_size=cache_cfg.hybrid.profile_bin_size,
-                prefetch_interval=cache_cfg.hybrid.prefetch_interval,
-                max_periods=cache_cfg.hybrid.max_periods,
-                k=cache_cfg.hybrid.k,
-            )
-        else:
-            raise ValueError(f"Unknown cache.strategy «{strat_name}» in config")
+        strat_name = self.cfg.cache.strategy
+        try:
+            build_strategy = STRATEGY_REGISTRY[strat_name]
+        except KeyError:
+            raise ValueError(f"Unknown cache.strategy «{strat_name}» in config") from None
+        strategy = build_strategy(self.cfg.cache, self.env, self.metrics, self.rng)
 
         # 4) Кеш
         self.cache = Cache(
@@ -116,8 +148,9 @@ class Simulator:
     def _init_clients(self) -> None:
         scfg = self.cfg.simulator
 
-        # ключ для запроса выбираем случайно из списка ресурсов
-        key_fn = lambda _: random.choice(self.resources)
+        # ключ для запроса выбираем случайно из списка ресурсов (поток пачками)
+        keys = self._key_stream()
+        key_fn = lambda _: next(keys)
 
         if scfg.arrival_pattern == "poisson":
             Client(
@@ -127,6 +160,7 @@ class Simulator:
                 start_time=scfg.start_time,
                 key_generator=key_fn,
                 name_prefix=scfg.client_prefix,
+                rng=self.rng,
             )
         elif scfg.arrival_pattern == "cyclic":
             CyclicClient(
@@ -138,29 +172,39 @@ class Simulator:
                 key_generator=key_fn,
                 start_time=scfg.start_time,
                 name_prefix=scfg.client_prefix,
+                rng=self.rng,
             )
         else:
             raise ValueError(f"Unknown simulator.arrival_pattern «{scfg.arrival_pattern}»")
 
+    def _key_stream(self):
+        """
+        Бесконечный поток равновероятно выбранных ресурсов: индексы берутся
+        пачками по _KEY_BATCH из генератора NumPy, сидированного из rng
+        симуляции, — на заявку остаётся один next() вместо random.choice.
+        """
+        resources = self.resources
+        key_rng = np.random.default_rng(self.rng.getrandbits(64))
+        while True:
+            for idx in key_rng.integers(0, len(resources), _KEY_BATCH).tolist():
+                yield resources[idx]
+
     def run(self) -> None:
         t_end = self.cfg.simulator.sim_time
-        logger.info(f"=== Simulation start until t={t_end} ===")
+        logger.info("=== Simulation start until t=%s ===", t_end)
 
         # Запускаем события до конца
         self.env.run(until=t_end)
+        self.cache.flush_log()
+        self.source.flush_metrics()
 
         # Собираем итоговые метрики
         self.metrics.collect_from(self)
+        self.metrics.close()
 
         # Экспортим результаты
-        payload = {
-            "settings": self.cfg.dict(),
-            "metrics": self.metrics.summary()
-        }
-        if self.cfg.output and self.cfg.output.path:
-            fn = Path(self.cfg.output.path).with_suffix("")
-            fn = fn.with_name(f"{fn.stem}_{datetime.now():%Y%m%d_%H%M%S}.json")
-            fn.parent.mkdir(parents=True, exist_ok=True)
-            with open(fn, "w", encoding="utf-8") as out:
-                json.dump(payload, out, indent=2, ensure_ascii=False)
-            logger.info(f"[Simulator] Metrics exported to {fn}")
+        if self._output_stem is not None:
+            fn = self._output_stem + ".json"
+            with open(fn, "wb", buffering=EXPORT_BUFFER_SIZE) as out:
+                self.metrics.write_json(out, {"settings": self.cfg.model_dump()})
+            logger.info("[Simulator] Metrics exported to %s", fn)
@@ -22,17 +22,21 @@
 Внутренняя реализация
 ---------------------
 * Стратегия получает `env` – доступ к времени SimPy и возможностям планирования.
-* В конструкторе порождаем фоновый процесс `_recalc_loop`, который будитcя
-  каждые `recalc_interval` сим‑единиц; можно задать интервал через конфиг.
+* В конструкторе планируем первый `_tick` через `call_later` (см. `des_core`):
+  тик пересчитывает TTL и сам назначает следующий через `recalc_interval`
+  сим‑единиц — без отдельного процесса SimPy; интервал задаётся в конфиге.
 * Все события TTL‑смен фиксируются в `MetricsCollector` (метод `record_ttl_change`)
   – это позволит потом визуализировать эволюцию алгоритма.
 """
 
 from __future__ import annotations
 
+import logging
+
 import simpy
 
 from cache_simulation.cache import CacheEntry
+from cache_simulation.des_core import scheduler
 from cache_simulation.logger import get_logger
 from cache_simulation.metrics import MetricsCollector
 from cache_simulation.strategies.base import CacheStrategy
@@ -60,6 +64,11 @@ class AdaptiveTTLStrategy(CacheStrategy):
         Жёсткие границы допустимого TTL.
     """
 
+    __slots__ = (
+        "env", "metrics", "_theta", "_recalc_interval", "_min_ttl", "_max_ttl", "ttl",
+        "_t_window_start", "_n_requests", "_n_misses", "_call_later", "_debug",
+    )
+
     def __init__(
             self,
             env: simpy.Environment,
@@ -83,18 +92,22 @@ class AdaptiveTTLStrategy(CacheStrategy):
         self._min_ttl = min_ttl
         self._max_ttl = max_ttl
 
+        # уровень DEBUG фиксируется при создании (как в FixedTTLStrategy)
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+
         # Текущее значение TTL
         self.ttl: float = initial_ttl
 
         # Счётчики внутри скользящего окна
         self._reset_window(now=env.now)
 
-        # Фоновый процесс регулярного пересчёта
-        env.process(self._recalc_loop())
+        # Регулярный пересчёт — цепочка отложенных вызовов
+        self._call_later = scheduler(env)
+        self._call_later(recalc_interval, self._tick)
 
         logger.info(
-            "AdaptiveTTLStrategy initialized: "
-            f"initial_ttl={initial_ttl}, θ={theta}, interval={recalc_interval}"
+            "AdaptiveTTLStrategy initialized: initial_ttl=%s, θ=%s, interval=%s",
+            initial_ttl, theta, recalc_interval,
         )
 
     # ------------------------------------------------------------------ #
@@ -104,11 +117,22 @@ class AdaptiveTTLStrategy(CacheStrategy):
         """Запись валидна, пока её возраст не превысил текущий TTL."""
         age = now - entry.timestamp
         valid = age <= self.ttl
-        logger.debug(
-            f"[AdaptiveTTL] is_valid? age={age:.3f}, ttl={self.ttl:.3f}, valid={valid}"
-        )
+        if self._debug:
+            logger.debug("[AdaptiveTTL] is_valid? age=%.3f, ttl=%.3f, valid=%s", age, self.ttl, valid)
         return valid
 
+    def make_validator(self):
+        """
+        Проверка без отладочного логирования: TTL меняется при пересчёте,
+        поэтому читается из стратегии на каждом вызове (слот, без __dict__).
+        """
+        strategy = self
+
+        def is_valid(entry: CacheEntry, now: float) -> bool:
+            return now - entry.timestamp <= strategy.ttl
+
+        return is_valid
+
     def on_access(self, entry: CacheEntry, now: float) -> None:
         """Любое обращение к кешу увеличивает число заявок n_requests."""
         self._n_requests += 1
@@ -130,11 +154,10 @@ class AdaptiveTTLStrategy(CacheStrategy):
         self._n_requests = 0
         self._n_misses = 0
 
-    def _recalc_loop(self):
-        """Периодически пересчитывает TTL (SimPy‑процесс)."""
-        while True:
-            yield self.env.timeout(self._recalc_interval)
-            self._recalculate_ttl(self.env.now)
+    def _tick(self) -> None:
+        """Периодический пересчёт TTL; следующий — через recalc_interval."""
+        self._recalculate_ttl(self.env.now)
+        self._call_later(self._recalc_interval, self._tick)
 
     def _recalculate_ttl(self, now: float) -> None:
         """Основная формула пересчёта + логирование."""
@@ -150,8 +173,8 @@ class AdaptiveTTLStrategy(CacheStrategy):
         ttl_new = max(self._min_ttl, min(self._max_ttl, ttl_new))
 
         logger.info(
-            f"[AdaptiveTTL] t={now:.2f}: λ̂_u={lam_u:.3f}, λ̂_upd={lam_upd:.3f} → "
-            f"TTL {self.ttl:.2f} → {ttl_new:.2f}"
+            "[AdaptiveTTL] t=%.2f: λ̂_u=%.3f, λ̂_upd=%.3f → TTL %.2f → %.2f",
+            now, lam_u, lam_upd, self.ttl, ttl_new,
         )
 
         # фиксируем метрику и применяем новое значение
@@ -1,7 +1,7 @@
 # cache_simulation/strategies/base.py.py
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
     from cache_simulation.cache import CacheEntry
@@ -13,6 +13,13 @@ class CacheStrategy(ABC):
     Определяет интерфейс для проверки валидности и реакцию на доступ/обновление.
     """
 
+    # пустые слоты: наследники, объявившие свои __slots__, обходятся без __dict__
+    __slots__ = ()
+
+    # False — соответствующий обработчик ничего не делает, и Cache его не вызывает
+    HAS_ON_ACCESS: bool = True
+    HAS_ON_UPDATE: bool = True
+
     @abstractmethod
     def is_valid(self, entry: "CacheEntry", now: float) -> bool:
         """
@@ -24,6 +31,17 @@ class CacheStrategy(ABC):
         """
         ...
 
+    def make_validator(self) -> Callable[["CacheEntry", float], bool]:
+        """
+        Вернуть предикат актуальности, который Cache привяжет один раз при создании
+        и будет вызывать на каждом запросе вместо `is_valid`.
+
+        По умолчанию — сам `is_valid`. Стратегии с неизменными параметрами могут
+        вернуть специализированную функцию (например, с TTL в замыкании),
+        избавленную от обращений к атрибутам и отладочного логирования.
+        """
+        return self.is_valid
+
     @abstractmethod
     def on_access(self, entry: "CacheEntry", now: float) -> None:
         """
@@ -1,5 +1,7 @@
 # cache_simulation/strategies/fixed_ttl.py
 
+import logging
+
 from cache_simulation.cache import CacheEntry
 from cache_simulation.logger import get_logger
 from cache_simulation.strategies.base import CacheStrategy
@@ -13,6 +15,12 @@ class FixedTTLStrategy(CacheStrategy):
     Запись считается валидной, если с момента последнего обновления прошло не более ttl.
     """
 
+    __slots__ = ("ttl", "_debug")
+
+    # on_access / on_update — пустые: Cache пропускает их вызов
+    HAS_ON_ACCESS = False
+    HAS_ON_UPDATE = False
+
     def __init__(self, ttl: float):
         """
         :param ttl: время жизни записи в тех же единицах, что и env.now
@@ -20,7 +28,9 @@ class FixedTTLStrategy(CacheStrategy):
         if ttl < 0:
             raise ValueError("TTL must be non-negative")
         self.ttl = ttl
-        logger.info(f"FixedTTLStrategy initialized with ttl={ttl}")
+        # уровень DEBUG фиксируется при создании (для is_valid вне горячего пути)
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        logger.info("FixedTTLStrategy initialized with ttl=%s", ttl)
 
     def is_valid(self, entry: CacheEntry, now: float) -> bool:
         """
@@ -28,18 +38,30 @@ class FixedTTLStrategy(CacheStrategy):
         """
         age = now - entry.timestamp
         valid = age <= self.ttl
-        logger.debug(
-            f"is_valid: now={now:.2f}, entry_ts={entry.timestamp:.2f}, age={age:.2f}, ttl={self.ttl}, valid={valid}")
+        if self._debug:
+            logger.debug("is_valid: now=%.2f, entry_ts=%.2f, age=%.2f, ttl=%s, valid=%s",
+                         now, entry.timestamp, age, self.ttl, valid)
         return valid
 
+    def make_validator(self):
+        """
+        Специализированная проверка с TTL, зафиксированным в замыкании.
+        TTL стратегии не меняется за время симуляции, поэтому значение
+        читается один раз — при создании Cache.
+        """
+        ttl = self.ttl
+
+        def is_valid(entry: CacheEntry, now: float) -> bool:
+            return now - entry.timestamp <= ttl
+
+        return is_valid
+
     def on_access(self, entry: CacheEntry, now: float) -> None:
         """
-        На HIT ничего не меняем.
+        На HIT ничего не меняем (вызывается на каждый HIT — без логирования).
         """
-        logger.debug(f"on_access: key version={entry.version}, timestamp={entry.timestamp:.2f}")
 
     def on_update(self, entry: CacheEntry, now: float) -> None:
         """
         При обновлении обновляем timestamp (делается при создании CacheEntry).
         """
-        logger.debug(f"on_update: entry updated to version={entry.version} at t={now:.2f}")
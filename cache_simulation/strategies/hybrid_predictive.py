@@ -1,6 +1,7 @@
 # cache_simulation/strategies/hybrid_predictive.py
 
-from typing import List
+import random
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import simpy
@@ -13,6 +14,10 @@ from cache_simulation.strategies.base import CacheStrategy
 
 logger = get_logger(__name__)
 
+# начальная ёмкость буфера моментов обновлений (при заполнении он уплотняется
+# или удваивается)
+_HISTORY_CAPACITY = 1024
+
 
 class HybridPredictiveStrategy(CacheStrategy):
     def __init__(self, *,
@@ -24,7 +29,8 @@ class HybridPredictiveStrategy(CacheStrategy):
                  profile_bin_size: float,
                  prefetch_interval: float,
                  max_periods: int,
-                 k: float):
+                 k: float,
+                 rng: Optional[random.Random] = None):
         # базовый адаптивный TTL
         self.base = base_strategy
         self.env = env
@@ -37,11 +43,27 @@ class HybridPredictiveStrategy(CacheStrategy):
         self.prefetch_interval = prefetch_interval
         self.max_periods = max_periods
         self.k = k
-
-        # хранить timestamps источника обновлений
-        self._update_history: List[float] = []
-        # профиль вероятностей по бинам и периодам
-        self._profiles = {}
+        # решения о prefetch — из генератора NumPy, сидированного из rng симуляции
+        # (по умолчанию — глобальный `random`), а не из глобального np.random
+        self._rng = np.random.default_rng((rng or random).getrandbits(64))
+
+        # моменты обновлений источника (неубывающие — время симуляции) в буфере
+        # float64; актуальная история — срез [_hist_lo:_hist_hi]. Окно анализа
+        # и сброс после prefetch только сдвигают _hist_lo (бинарным поиском),
+        # а анализ получает историю готовым массивом, без копирования
+        self._hist_buf = np.empty(_HISTORY_CAPACITY)
+        self._hist_lo = 0
+        self._hist_hi = 0
+        # профили по периодам: T → (начало окна анализа, вероятности по бинам);
+        # бин момента t — индекс int(((t − начало окна) mod T) / profile_bin)
+        self._profiles: Dict[float, Tuple[float, np.ndarray]] = {}
+        # те же профили столбцами для _prefetch_loop: периоды, начала окон и
+        # матрица вероятностей (строка — период, хвост дополнен нулями);
+        # пересобираются, только когда анализ изменил _profiles
+        self._profiles_dirty = False
+        self._periods = np.empty(0)
+        self._window_starts = np.empty(0)
+        self._probs = np.empty((0, 0))
 
         # фоновые процессы
         env.process(self._analysis_loop())
@@ -51,64 +73,128 @@ class HybridPredictiveStrategy(CacheStrategy):
     def is_valid(self, entry: CacheEntry, now: float) -> bool:
         return self.base.is_valid(entry, now)
 
+    def make_validator(self):
+        # проверка целиком реактивная — отдаём предикат базовой стратегии без прослойки
+        return self.base.make_validator()
+
     def on_access(self, entry: CacheEntry, now: float) -> None:
         return self.base.on_access(entry, now)
 
     def on_update(self, entry: CacheEntry, now: float) -> None:
         # сюда попадаем при miss → источник гарантированно обновлён
-        self._update_history.append(now)
+        if self._hist_hi == self._hist_buf.size:
+            self._compact_history()
+        self._hist_buf[self._hist_hi] = now
+        self._hist_hi += 1
         return self.base.on_update(entry, now)
 
     def on_prefetch_success(self, entry: CacheEntry, now: float) -> None:
         # сбрасываем историю до последнего fetch, чтобы не портить статистику
-        self._update_history = [t for t in self._update_history if t > now]
+        lo = self._hist_lo
+        self._hist_lo = lo + int(np.searchsorted(self._hist_buf[lo:self._hist_hi], now, side="right"))
+
+    def _compact_history(self) -> None:
+        """Переносит актуальную историю в начало буфера; если она занимает больше половины — удваивает буфер."""
+        live = self._hist_buf[self._hist_lo:self._hist_hi]
+        buf = self._hist_buf
+        if 2 * live.size > buf.size:
+            buf = np.empty(2 * buf.size)
+        buf[:live.size] = live
+        self._hist_buf = buf
+        self._hist_lo, self._hist_hi = 0, live.size
 
     # ——— анализ FFT каждые analyze_interval ———
     def _analysis_loop(self):
         while True:
             yield self.env.timeout(self.analyze_interval)
-            window_start = self.env.now - self.history_window
-            hist = [t for t in self._update_history if t >= window_start]
-            if len(hist) < 2:
+            now = self.env.now
+            window_start = now - self.history_window
+            lo, hi = self._hist_lo, self._hist_hi
+            lo += int(np.searchsorted(self._hist_buf[lo:hi], window_start, side="left"))
+            self._hist_lo = lo
+            if hi - lo < 2:
                 continue
+            hist = self._hist_buf[lo:hi]
 
             # строим интервальную функцию: бинаризуем события в бины
-            bins = np.arange(window_start, self.env.now + self.profile_bin, self.profile_bin)
-            counts, _ = np.histogram(hist, bins=bins)
+            bins = np.arange(window_start, now + self.profile_bin, self.profile_bin)
+            n_bins = len(bins) - 1
+            # бины одной ширины: номер бина — целая часть отношения, без поиска по
+            # границам; правая граница последнего бина включается, как в np.histogram
+            bin_idx = ((hist - window_start) / self.profile_bin).astype(np.intp)
+            counts = np.bincount(np.minimum(bin_idx, n_bins - 1), minlength=n_bins)
             # делаем FFT
             freqs = np.fft.fftfreq(len(counts), d=self.profile_bin)
             mag = np.abs(np.fft.fft(counts))
             idx = np.argsort(mag)[-self.max_periods:]
             periods = [1 / abs(freqs[i]) for i in idx if freqs[i] != 0]
-            self.metrics.record_periods(self.env.now, periods)
-
-            # строим профиль вероятностей для каждого периода
+            self.metrics.record_periods(now, periods)
+
+            # профиль вероятностей по бинам не зависит от T: он строится один раз
+            # и один и тот же объект привязывается ко всем найденным периодам
+            # (периоды прошлых тиков остаются со своими профилями)
+            total = counts.sum()
+            probs = counts / total if total > 0 else np.zeros(n_bins)
+            profile = (window_start, probs)
+            bin_starts = bins[:-1].tolist()
+            prob_list = probs.tolist()
+            ingest_profile = self.metrics.ingest_profile
             for T in periods:
-                profile = {}
-                for i, b in enumerate(bins[:-1]):
-                    # вероятность события в бинi
-                    p = counts[i] / counts.sum() if counts.sum() > 0 else 0
-                    profile[b] = p
-                    self.metrics.record_profile(self.env.now, T, b, p)
                 self._profiles[T] = profile
+                ingest_profile(now, T, bin_starts, prob_list)
+            if periods:
+                self._profiles_dirty = True
+
+    def _rebuild_profile_arrays(self) -> None:
+        profiles = self._profiles
+        n = len(profiles)
+        self._periods = np.fromiter(profiles, dtype=np.float64, count=n)
+        self._window_starts = np.fromiter(
+            (ws for ws, _ in profiles.values()), dtype=np.float64, count=n)
+        width = max(probs.size for _, probs in profiles.values())
+        self._probs = np.zeros((n, width))
+        for row, (_, probs) in zip(self._probs, profiles.values()):
+            row[:probs.size] = probs
+        self._profiles_dirty = False
 
     # ——— префетчинг каждые prefetch_interval ———
     def _prefetch_loop(self):
+        # до первого анализа профилей нет: тики, приходящиеся на это время,
+        # пропускаются одним таймаутом; момент первого пробуждения накапливается
+        # теми же сложениями, что и env.now, поэтому расписание тиков прежнее
+        delay = self.prefetch_interval
+        while delay < self.analyze_interval:
+            delay += self.prefetch_interval
         while True:
-            yield self.env.timeout(self.prefetch_interval)
+            yield self.env.timeout(delay)
+            delay = self.prefetch_interval
             now = self.env.now
-            for T, profile in self._profiles.items():
-                # выбираем бин по текущему времени
-                bin_start = now - (now % self.profile_bin)
-                p = profile.get(bin_start, 0)
-                # вероятность предиктива
-                p_pred = 1 - np.exp(-self.k * p * self.history_window / T)
-                if np.random.rand() < p_pred:
-                    # запускаем prefetch
-                    self.metrics.record_event(now, "prefetch_trigger", None, len(self._profiles))
-                    # self._cache.request(...) вызовит on_prefetch_success()
-                    # стратегии нужно иметь доступ к Cache, поэтому мы сохраняем его при init
-                    self.cache_ref.request(self.key, is_prefetch=True)
+            if not self._profiles:
+                continue
+            if self._profiles_dirty:
+                self._rebuild_profile_arrays()
+            # вероятности текущего бина по всем периодам → одно векторное решение;
+            # профиль периодичен: момент now переносится в окно своего профиля по
+            # фазе, ((now − начало окна) mod T) / profile_bin (T не длиннее окна),
+            # за концом более короткой строки профиля p = 0
+            periods, probs = self._periods, self._probs
+            phase = np.mod(now - self._window_starts, periods)
+            idx = (phase / self.profile_bin).astype(np.intp)
+            inside = idx < probs.shape[1]
+            p = np.zeros(periods.size)
+            p[inside] = probs[inside, idx[inside]]
+            p_pred = 1.0 - np.exp(-self.k * p * self.history_window / periods)
+            fired = np.count_nonzero(self._rng.random(p_pred.size) < p_pred)
+            if not fired:
+                continue
+            request, record_event = self.cache_ref.request, self.metrics.record_event
+            for _ in range(fired):
+                # запускаем prefetch
+                record_event(now, "prefetch_trigger", None, periods.size)
+                # self._cache.request(...) вызовит on_prefetch_success()
+                # стратегии нужно иметь доступ к Cache, поэтому мы сохраняем его при init;
+                # Cache.request — генератор, поэтому запускаем его отдельным процессом
+                self.env.process(request(self.key, is_prefetch=True))
 
     # ——— метод для привязки Cache и ключа ресурса ———
     def bind_cache(self, cache, key):
@@ -1,6 +1,4 @@
-import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
-from matplotlib import cm
+import numpy as np
 
 
 class SimulationVisualizer:
@@ -8,6 +6,9 @@ class SimulationVisualizer:
     Визуализатор DES-симуляции кеширования:
       - plot_request_flow: диаграмма Ганта запросов + стрелки потоков
       - plot_version_timeline: две дорожки (реальная версия и версия в кеше) для одного ресурса
+
+    Matplotlib импортируется внутри методов построения: импорт модуля (и
+    пакета) не тратит на него время в прогонах без графиков.
     """
 
     def __init__(self, metrics: dict, resource_name: str = None):
@@ -17,10 +18,12 @@ class SimulationVisualizer:
         self.real_updates = metrics.get("source_updates_detail", [])
 
         # конец симуляции = максимум из всех моментов завершения и обновлений
-        all_times = [c["finish"] for c in self.cache_calls] + \
-                    [c["finish"] for c in self.source_calls] + \
-                    [u["time"] for u in self.real_updates]
-        self.t_end = max(all_times) if all_times else 0.0
+        # (по одному проходу на каждый список, без общей копии)
+        self.t_end = max(
+            max((c["finish"] for c in self.cache_calls), default=0.0),
+            max((c["finish"] for c in self.source_calls), default=0.0),
+            max((u["time"] for u in self.real_updates), default=0.0),
+        )
 
         # выбираем ресурс
         self.resource = resource_name or (
@@ -45,57 +48,99 @@ class SimulationVisualizer:
             "miss": "Промах"
         }
 
+        # события выбранного ресурса отбираются один раз и хранятся столбцами
+        # NumPy; тип ответа кеша — индекс в палитре cache_colors, неизвестный
+        # тип получает последний код (цвет «по умолчанию» своей дорожки)
+        self._type_codes = {t: i for i, t in enumerate(self.cache_colors)}
+        unknown = len(self._type_codes)
+
+        calls = [c for c in self.cache_calls if c["key"] == self.resource]
+        n = len(calls)
+        self._cc_start = np.fromiter((c["start"] for c in calls), dtype=float, count=n)
+        self._cc_finish = np.fromiter((c["finish"] for c in calls), dtype=float, count=n)
+        self._cc_type = np.fromiter(
+            (self._type_codes.get(c["type"], unknown) for c in calls), dtype=np.int8, count=n
+        )
+        self._cc_version = np.fromiter((c["version"] for c in calls), dtype=np.int64, count=n)
+
+        srcs = [c for c in self.source_calls if c["resource"] == self.resource]
+        n = len(srcs)
+        self._src_start = np.fromiter((c["start"] for c in srcs), dtype=float, count=n)
+        self._src_finish = np.fromiter((c["finish"] for c in srcs), dtype=float, count=n)
+
+        upds = [u for u in self.real_updates if u["resource"] == self.resource]
+        n = len(upds)
+        self._upd_time = np.fromiter((u["time"] for u in upds), dtype=float, count=n)
+        self._upd_version = np.fromiter((u["new_version"] for u in upds), dtype=np.int64, count=n)
+
+    def _palette(self, default: str) -> np.ndarray:
+        """RGBA-палитра по кодам типов; последняя строка — цвет для неизвестного типа."""
+        from matplotlib.colors import to_rgba_array
+
+        return to_rgba_array(list(self.cache_colors.values()) + [default])
+
+    def _source_call_types(self) -> np.ndarray:
+        """
+        Код типа ответа кеша для каждого запроса к источнику — по совпадению
+        момента начала (с точностью 1e-6). При нескольких запросах к кешу в
+        один момент берётся первый; без совпадения — код неизвестного типа.
+        """
+        codes = np.full(len(self._src_start), len(self._type_codes), dtype=np.int8)
+        if not len(self._cc_start) or not len(codes):
+            return codes
+        starts, first = np.unique(np.round(self._cc_start, 6), return_index=True)
+        wanted = np.round(self._src_start, 6)
+        pos = np.minimum(np.searchsorted(starts, wanted), len(starts) - 1)
+        found = starts[pos] == wanted
+        codes[found] = self._cc_type[first[pos[found]]]
+        return codes
+
     def plot_request_flow(self, ax=None):
         """
         Рисует диаграмму Ганта для запросов:
           Пользователь → Кеш → Внешний источник
         """
+        import matplotlib.patches as mpatches
+        import matplotlib.pyplot as plt
+
         if ax is None:
             fig, ax = plt.subplots(figsize=(12, 4))
 
         lane_y = {"user": 2, "cache": 1, "external": 0}
         height = 0.3
 
-        # запросы к кешу
-        for call in self.cache_calls:
-            if call["key"] != self.resource:
-                continue
-            t0, t1 = call["start"], call["finish"]
-            color = self.cache_colors.get(call["type"], "gray")
-            ax.broken_barh(
-                [(t0, t1 - t0)],
-                (lane_y["cache"] - height / 2, height),
-                facecolors=color, edgecolors="black"
-            )
+        # запросы к кешу: отрезки рисуются одним broken_barh
+        # (одна коллекция вместо патча на каждый запрос)
+        colors = self._palette("gray")[self._cc_type]
+        for t0, color in zip(self._cc_start.tolist(), colors):
             ax.annotate(
                 "",
                 xy=(t0, lane_y["cache"]),
                 xytext=(t0, lane_y["user"]),
                 arrowprops=dict(arrowstyle="->", color=color)
             )
-
-        # запросы к внешнему источнику
-        for src in self.source_calls:
-            if src["resource"] != self.resource:
-                continue
-            t0, t1 = src["start"], src["finish"]
-            matching = next(
-                (c for c in self.cache_calls
-                 if c["key"] == src["resource"] and abs(c["start"] - t0) < 1e-6),
-                None
-            )
-            color = self.cache_colors.get(matching["type"], "lightgray") if matching else "lightgray"
+        if len(colors):
             ax.broken_barh(
-                [(t0, t1 - t0)],
-                (lane_y["external"] - height / 2, height),
-                facecolors=color, edgecolors="black"
+                np.column_stack((self._cc_start, self._cc_finish - self._cc_start)),
+                (lane_y["cache"] - height / 2, height),
+                facecolors=colors, edgecolors="black", rasterized=True
             )
+
+        # запросы к внешнему источнику, цвет — по типу соответствующего ответа кеша
+        colors = self._palette("lightgray")[self._source_call_types()]
+        for t0, color in zip(self._src_start.tolist(), colors):
             ax.annotate(
                 "",
                 xy=(t0, lane_y["external"]),
                 xytext=(t0, lane_y["cache"]),
                 arrowprops=dict(arrowstyle="->", color=color)
             )
+        if len(colors):
+            ax.broken_barh(
+                np.column_stack((self._src_start, self._src_finish - self._src_start)),
+                (lane_y["external"] - height / 2, height),
+                facecolors=colors, edgecolors="black", rasterized=True
+            )
 
         ax.set_ylim(-0.5, 2.5)
         ax.set_xlim(0, self.t_end)
@@ -120,6 +165,10 @@ class SimulationVisualizer:
           Реальная версия (y=1) и версия в кеше (y=0) ресурса.
         Цвет каждого сегмента зависит от номера версии.
         """
+        import matplotlib.patches as mpatches
+        import matplotlib.pyplot as plt
+        from matplotlib import cm
+
         if ax is None:
             fig, ax = plt.subplots(figsize=(12, 3))
 
@@ -128,23 +177,18 @@ class SimulationVisualizer:
         cmap = cm.get_cmap("tab20")
 
         # --- Реальная версия ---
-        real_points = [{"time": 0.0, "new_version": 0}] + [
-            u for u in self.real_updates if u["resource"] == self.resource
-        ]
-        real_points.append({"time": self.t_end, "new_version": real_points[-1]["new_version"]})
-
-        for prev, curr in zip(real_points, real_points[1:]):
-            t0 = prev["time"]
-            t1 = curr["time"]
-            v = prev["new_version"]
-            ax.broken_barh(
-                [(t0, t1 - t0)],
-                (y_real - height / 2, height),
-                facecolors=cmap(v % cmap.N), edgecolors="black"
-            )
+        # версия 0 с начала симуляции, каждая следующая — с момента обновления
+        times = np.concatenate(([0.0], self._upd_time, [self.t_end]))
+        versions = np.concatenate(([0], self._upd_version))
+        ax.broken_barh(
+            np.column_stack((times[:-1], np.diff(times))),
+            (y_real - height / 2, height),
+            facecolors=cmap(versions % cmap.N),
+            edgecolors="black", rasterized=True
+        )
 
         # легенда реальных версий
-        real_versions = sorted({p["new_version"] for p in real_points})
+        real_versions = np.unique(versions).tolist()
         patches_real = [
             mpatches.Patch(color=cmap(v % cmap.N), label=f"v={v}")
             for v in real_versions
@@ -155,29 +199,19 @@ class SimulationVisualizer:
         #           loc="upper left")
 
         # --- Версия в кеше ---
-        cache_updates = sorted(
-            [c for c in self.cache_calls
-             if c["key"] == self.resource and c["type"] == "miss"],
-            key=lambda c: c["finish"]
-        )
-
-        if cache_updates:
-            last_t = cache_updates[0]["finish"]
-            last_v = cache_updates[0]["version"]
-            for upd in cache_updates[1:]:
-                t0 = last_t
-                t1 = upd["finish"]
-                ax.broken_barh(
-                    [(t0, t1 - t0)],
-                    (y_cache - height / 2, height),
-                    facecolors=cmap(last_v % cmap.N), edgecolors="black"
-                )
-                last_t, last_v = t1, upd["version"]
-            # последний сегмент до конца симуляции
+        misses = self._cc_type == self._type_codes["miss"]
+        order = np.argsort(self._cc_finish[misses], kind="stable")
+        starts = self._cc_finish[misses][order]
+
+        if len(starts):
+            # каждая версия держится от своего fetch-а до следующего,
+            # последняя — до конца симуляции
+            ends = np.append(starts[1:], self.t_end)
             ax.broken_barh(
-                [(last_t, self.t_end - last_t)],
+                np.column_stack((starts, ends - starts)),
                 (y_cache - height / 2, height),
-                facecolors=cmap(last_v % cmap.N), edgecolors="black"
+                facecolors=cmap(self._cc_version[misses][order] % cmap.N),
+                edgecolors="black", rasterized=True
             )
 
         ax.set_ylim(-0.5, 1.5)
@@ -193,14 +227,20 @@ class SimulationVisualizer:
     def show_all(self):
         """
         Выводит оба графика на одной фигуре.
+        Дорожки растеризуются (rasterized=True), а упрощение путей включено
+        только на время показа, чтобы zoom/pan на длинных прогонах не
+        перерисовывал каждый отрезок как вектор.
         """
-        fig = plt.figure(constrained_layout=True, figsize=(14, 8))
-        gs = fig.add_gridspec(3, 1, height_ratios=[2, 1, 2])
+        import matplotlib.pyplot as plt
+
+        with plt.rc_context({"path.simplify": True, "path.simplify_threshold": 1.0}):
+            fig = plt.figure(constrained_layout=True, figsize=(14, 8))
+            gs = fig.add_gridspec(3, 1, height_ratios=[2, 1, 2])
 
-        ax1 = fig.add_subplot(gs[0, 0])
-        self.plot_request_flow(ax1)
+            ax1 = fig.add_subplot(gs[0, 0])
+            self.plot_request_flow(ax1)
 
-        ax2 = fig.add_subplot(gs[1:, 0])
-        self.plot_version_timeline(ax2)
+            ax2 = fig.add_subplot(gs[1:, 0])
+            self.plot_version_timeline(ax2)
 
-        plt.show()
+            plt.show()
@@ -1,12 +1,12 @@
 # scripts/run_simulation.py
 
 import argparse
+import os
 import sys
 
 from cache_simulation.config import Settings
 from cache_simulation.logger import setup_logging, get_logger
 from cache_simulation.simulator import Simulator
-from cache_simulation.visualizer import SimulationVisualizer
 
 logger = get_logger(__name__)
 
@@ -27,14 +27,26 @@ def parse_args():
         action="store_true",
         help="Не экспортировать метрики в файл"
     )
+    parser.add_argument(
+        "--validate-config",
+        action="store_true",
+        help="Только проверить конфиг (полная валидация pydantic) и выйти"
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
 
-    # Загрузка конфига
-    settings = Settings.load(path=args.config)
+    # Загрузка конфига: CACHE_SIM_TRUSTED_CONFIG=1 пропускает валидацию pydantic
+    if args.validate_config:
+        Settings.load(path=args.config)
+        print("Config OK")
+        return 0
+    if os.getenv("CACHE_SIM_TRUSTED_CONFIG") == "1":
+        settings = Settings.load_trusted(path=args.config)
+    else:
+        settings = Settings.load(path=args.config)
 
     # Настройка логирования (файл + консоль) сразу, т.к. внутри Simulator тоже вызывается setup_logging
     setup_logging(settings)
@@ -46,20 +58,22 @@ def main():
     # Запуск симуляции
     sim.run()
 
-    # Печать сводки по метрикам
-    summary = sim.metrics.summary()
+    # Печать сводки по метрикам: только агрегаты — подробные логи (сотни тысяч
+    # записей) в консоль не выводятся и в строку не форматируются
     print("\n=== Simulation Metrics Summary ===")
-    for k, v in summary.items():
+    for k, v in sim.metrics.aggregate_summary().items():
         print(f"{k:20}: {v}")
 
-    viz = SimulationVisualizer(summary)
+    # matplotlib подгружается только здесь, а не при старте скрипта
+    from cache_simulation.visualizer import SimulationVisualizer
+    viz = SimulationVisualizer(sim.metrics.full_summary())
     viz.show_all()
 
     if args.no_export:
         logger.info("Skipping metrics export (--no-export)")
     else:
         if settings.output is not None and settings.output.path:
-            logger.info(f"Metrics were exported to {settings.output.path}(.json)")
+            logger.info("Metrics were exported to %s(.json)", settings.output.path)
         else:
             logger.warning("No output.path in config; nothing was exported")
 
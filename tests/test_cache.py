@@ -0,0 +1,37 @@
+import simpy
+
+from cache_simulation.cache import Cache
+from cache_simulation.metrics import MetricsCollector
+from cache_simulation.resources.simple import SimpleResource
+from cache_simulation.strategies.fixed_ttl import FixedTTLStrategy
+
+
+def test_concurrent_misses_share_single_fetch():
+    """
+    Одновременные MISS-ы по одному ключу должны консолидироваться
+    в один запрос к источнику (без thundering herd).
+    """
+    env = simpy.Environment()
+    metrics = MetricsCollector()
+    resource = SimpleResource("r-1", update_rate=0.0)
+    source_calls = []
+
+    def source_request(key):
+        source_calls.append(env.now)
+        yield env.timeout(5.0)
+        return f"data_for_{key.name}", key.version
+
+    cache = Cache(env, source_request, FixedTTLStrategy(ttl=60.0), metrics)
+    results = []
+
+    def client():
+        results.append((yield from cache.request(resource)))
+
+    for _ in range(5):
+        env.process(client())
+    env.run(until=10.0)
+
+    assert len(source_calls) == 1
+    assert results == [("data_for_r-1", 0)] * 5
+    assert metrics.cache_updates == 1
+    assert len(metrics.miss_times) == 5
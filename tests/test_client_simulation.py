@@ -1,61 +1,79 @@
+import math
 import random
 
-import matplotlib.pyplot as plt
+import numpy as np
 import simpy
 
 from cache_simulation.external_source import ExternalSource
-from cache_simulation.logger import setup_logging, get_logger
+from cache_simulation.logger import get_logger
+from cache_simulation.resources.simple import SimpleResource
 
-setup_logging()
 logger = get_logger(__name__)
 
+RANDOM_SEED = 42
+SIM_TIME = 10
+ARRIVAL_INTERVAL = 1  # клиенты приходят каждую секунду
+EXTRA_TIME = 2000  # дополнительное время для фоновых обновлений
 
-def test_client_simulation():
+
+def simulate_clients():
     """
-    Демонстрация работы клиентов с ExternalSource и построение графиков:
-    - гистограмма времён ожидания клиентов
-    - эволюция версии данных во времени
+    Клиенты приходят каждые ARRIVAL_INTERVAL до SIM_TIME и обращаются к
+    ExternalSource за одним ресурсом. Возвращает источник, ресурс и для
+    каждого обслуженного клиента: время ответа, момент ответа, версию данных.
     """
-    RANDOM_SEED = 42
-    SIM_TIME = 10
-    ARRIVAL_INTERVAL = 1  # клиенты приходят каждую секунду
-    EXTRA_TIME = 2000  # дополнительное время для фоновых обновлений
-
-    random.seed(RANDOM_SEED)
     env = simpy.Environment()
 
-    # Внешний источник: обслуживание 3–10 с, обновления ~1 раз в 20 с
+    # Внешний источник: обслуживание 3–10 с, обновления ~1 раз в 50 с
+    resource = SimpleResource("r-1", update_rate=1 / 50)
     source = ExternalSource(env,
                             min_service=3.0,
                             max_service=10.0,
-                            update_rate=1 / 50)
-
-    wait_times = []
-    versions = []
-    times = []
+                            resources=[resource],
+                            rng=random.Random(RANDOM_SEED))
+
+    # число клиентов известно заранее (приходы в 0, I, 2I, … < SIM_TIME) —
+    # массивы результатов выделяются сразу и точно по размеру: лишний
+    # клиент вызвал бы IndexError, недостающий — видно по n_served
+    n_clients = math.ceil(SIM_TIME / ARRIVAL_INTERVAL)
+    wait_times = np.empty(n_clients)
+    versions = np.empty(n_clients, dtype=np.int64)
+    times = np.empty(n_clients)
+    n_served = 0
 
     def client(env, source, client_id):
+        nonlocal n_served
         arrival = env.now
-        with source.server.request() as req:
-            yield req
-            wait = env.now - arrival
-            wait_times.append(wait)
-            service_time = random.uniform(source.min_service, source.max_service)
-            yield env.timeout(service_time)
-            versions.append(source.version)
-            times.append(env.now)
-
-    # Генерация клиентов до SIM_TIME
-    next_arrival = 0.0
-    while next_arrival < SIM_TIME:
-        env.process(client(env, source, int(next_arrival / ARRIVAL_INTERVAL) + 1))
-        env.run(until=next_arrival + ARRIVAL_INTERVAL)
-        next_arrival += ARRIVAL_INTERVAL
-
-    # Дадим еще немного времени фоновым обновлениям
+        # ожидание в общей очереди источника + обслуживание
+        _, version = yield from source.request(resource)
+        wait_times[n_served] = env.now - arrival
+        versions[n_served] = version
+        times[n_served] = env.now
+        n_served += 1
+
+    def arrivals(env):
+        """Генерация клиентов до SIM_TIME с шагом ARRIVAL_INTERVAL."""
+        client_id = 0
+        while env.now < SIM_TIME:
+            client_id += 1
+            env.process(client(env, source, client_id))
+            yield env.timeout(ARRIVAL_INTERVAL)
+
+    # один прогон: клиенты и фоновые обновления (EXTRA_TIME — запас после SIM_TIME)
+    env.process(arrivals(env))
     env.run(until=SIM_TIME + EXTRA_TIME)
 
-    # Построение графиков
+    return source, resource, wait_times[:n_served], times[:n_served], versions[:n_served]
+
+
+def plot_clients(wait_times, times, versions):
+    """
+    Графики:
+    - гистограмма времён ожидания клиентов
+    - эволюция версии данных во времени
+    """
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(2, 1, figsize=(8, 6))
     axes[0].hist(wait_times, bins=10)
     axes[0].set_title('Гистограмма времён ожидания клиентов')
@@ -67,10 +85,38 @@ def test_client_simulation():
     axes[1].set_xlabel('Время моделирования (с)')
     axes[1].set_ylabel('Версия данных')
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return fig
+
+
+def test_client_simulation():
+    """
+    Все клиенты, пришедшие до SIM_TIME, обслужены по очереди: ответы идут
+    в порядке прихода, каждый не быстрее min_service, а версии данных
+    не убывают и не превышают итоговую версию ресурса.
+    """
+    import matplotlib.pyplot as plt
+
+    source, resource, wait_times, times, versions = simulate_clients()
+
+    # буферы заполнены целиком: обслужен каждый из заранее посчитанных клиентов
+    assert len(wait_times) == len(times) == len(versions) == math.ceil(SIM_TIME / ARRIVAL_INTERVAL)
+    assert np.all(wait_times >= source.min_service)
+    assert np.all(np.diff(times) > 0)
+    assert np.all(np.diff(versions) >= 0)
+    assert versions[-1] <= resource.version
+
+    plt.close(plot_clients(wait_times, times, versions))
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    from cache_simulation.config import Settings
+    from cache_simulation.logger import setup_logging
+
+    setup_logging(Settings.load())
     logger.info("Test Client Simulation started")
-    test_client_simulation()
+    _, _, wait_times, times, versions = simulate_clients()
+    plot_clients(wait_times, times, versions)
+    plt.show()
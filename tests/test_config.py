@@ -0,0 +1,16 @@
+from pathlib import Path
+
+import pytest
+
+from cache_simulation.config import Settings
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
+
+
+@pytest.mark.parametrize("path", sorted(CONFIG_DIR.glob("*.yaml")), ids=lambda p: p.name)
+def test_load_trusted_matches_validated(path):
+    """
+    Сборка без валидации (model_construct) даёт те же настройки, что и
+    полная валидация pydantic, — для каждого конфига из config/.
+    """
+    assert Settings.load_trusted(str(path)) == Settings.load(str(path))
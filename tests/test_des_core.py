@@ -0,0 +1,95 @@
+import pytest
+
+from cache_simulation.des_core import MicroEnv
+
+
+def test_call_later_interleaves_with_processes():
+    """
+    Отложенные вызовы и SimPy-процессы делят одну очередь событий;
+    run(until) не обрабатывает события, назначенные на момент until.
+    """
+    env = MicroEnv()
+    log = []
+
+    def tick():
+        log.append(("tick", env.now))
+        env.call_later(2.0, tick)
+
+    def proc():
+        while True:
+            yield env.timeout(3.0)
+            log.append(("proc", env.now))
+
+    env.call_later(0.0, tick)
+    env.process(proc())
+    env.run(until=6.0)
+
+    assert env.now == 6.0
+    assert log == [
+        ("tick", 0.0), ("tick", 2.0), ("proc", 3.0), ("tick", 4.0),
+    ]
+
+
+def test_run_until_stops_with_calls_still_queued():
+    """
+    run(until) останавливается ровно в until: вызовы на until и позже
+    остаются в очереди и выполняются следующим run.
+    """
+    env = MicroEnv()
+    log = []
+    for t in (5.0, 10.0, 15.0):
+        env.call_later(t, log.append, t)
+
+    env.run(until=10.0)
+    assert env.now == 10.0
+    assert log == [5.0]
+    assert env.peek() == 10.0
+
+    env.run(until=20.0)
+    assert env.now == 20.0
+    assert log == [5.0, 10.0, 15.0]
+
+
+def test_same_time_calls_fifo_after_urgent_events():
+    """
+    Одновременные вызовы call_later выполняются в порядке постановки,
+    а URGENT-события (запуск процесса) того же момента — раньше них.
+    """
+    env = MicroEnv()
+    log = []
+
+    def proc():
+        log.append("proc")
+        yield env.timeout(0)
+
+    env.call_later(0.0, log.append, "a")
+    env.call_later(0.0, log.append, "b")
+    env.process(proc())  # Initialize — URGENT, поставлен последним
+    env.call_later(0.0, log.append, "c")
+    env.run(until=1.0)
+
+    assert log == ["proc", "a", "b", "c"]
+
+
+def test_run_with_empty_queue():
+    """Пустая очередь: run() сразу возвращается, run(until) просто сдвигает время."""
+    env = MicroEnv()
+    assert env.run() is None
+    assert env.now == 0.0
+    assert env.run(until=5.0) is None
+    assert env.now == 5.0
+    with pytest.raises(ValueError):
+        env.run(until=5.0)
+
+
+def test_callback_exception_propagates_out_of_run():
+    """Исключение из отложенного вызова выходит из run в момент вызова."""
+    env = MicroEnv()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    env.call_later(3.0, boom)
+    with pytest.raises(RuntimeError, match="boom"):
+        env.run(until=10.0)
+    assert env.now == 3.0
@@ -0,0 +1,88 @@
+import math
+import random
+
+import numpy as np
+import pytest
+import simpy
+
+from cache_simulation.external_source import ExternalSource
+from cache_simulation.metrics import MetricsCollector
+from cache_simulation.resources.simple import SimpleResource
+
+
+def test_requests_share_single_fifo_server():
+    """
+    Пересекающиеся запросы к источнику обслуживаются одним сервером по
+    очереди: finish = max(момент прихода, finish предыдущего) + обслуживание.
+    """
+    env = simpy.Environment()
+    resource = SimpleResource("r-1", update_rate=0.0)
+    source = ExternalSource(env, min_service=3.0, max_service=10.0,
+                            resources=[resource], horizon=100.0, rng=random.Random(7))
+
+    # запоминаем фактически выбранные времена обслуживания (в порядке запросов)
+    service_times = []
+    draw = source._next_service_time
+    source._next_service_time = lambda: service_times.append(draw()) or service_times[-1]
+
+    arrivals = [0.0, 1.0, 2.0, 2.0, 60.0, 61.0]  # 60 — после простоя сервера
+    finishes = [None] * len(arrivals)
+
+    def client(i, t):
+        yield env.timeout(t)
+        value, version = yield from source.request(resource)
+        assert (value, version) == ("data_for_r-1", 0)
+        finishes[i] = env.now
+
+    for i, t in enumerate(arrivals):
+        env.process(client(i, t))
+    env.run()
+
+    prev_finish = 0.0
+    for arrival, service, finish in zip(arrivals, service_times, finishes):
+        assert finish == pytest.approx(max(arrival, prev_finish) + service)
+        prev_finish = finish
+    assert len(service_times) == len(arrivals)
+    # после простоя очередь пуста — запрос в 60 обслуживается сразу
+    assert finishes[4] == pytest.approx(60.0 + service_times[4])
+    # без metrics строки вызовов не копятся
+    assert source._call_rows == []
+
+
+@pytest.mark.parametrize("pattern", ["poisson", "cyclic"])
+def test_pregenerated_updates(pattern):
+    """
+    Заранее сгенерированные обновления: моменты отсортированы и лежат до
+    horizon, число обновлений ресурса близко к λ·horizon (для циклического
+    шаблона синус за целое число периодов интегрируется в ноль), а при
+    воспроизведении версия каждого ресурса растёт ровно на 1.
+    """
+    horizon, rate = 200_000.0, 0.01
+    period, amplitude, phase = 10_000.0, 1.0, 2_500.0
+    env = simpy.Environment()
+    metrics = MetricsCollector()
+    resources = [SimpleResource(f"r-{i}", rate) for i in range(3)]
+    resources.append(SimpleResource("static", 0.0))  # без обновлений
+    source = ExternalSource(env, 1.0, 2.0, resources, metrics=metrics, update_pattern=pattern,
+                            cycle_period=period, cycle_amplitude=amplitude, peak_phase=phase,
+                            horizon=horizon, rng=random.Random(3))
+
+    times, owners = source.pregenerate(horizon, pattern, period, amplitude, phase)
+    assert np.all(np.diff(times) >= 0)
+    assert times[0] >= 0.0 and times[-1] < horizon
+    expected = rate * horizon
+    counts = np.bincount(owners, minlength=len(resources))
+    assert counts[-1] == 0
+    for n in counts[:-1]:
+        assert abs(n - expected) < 5 * math.sqrt(expected)
+
+    # воспроизведение шкалы, построенной в конструкторе
+    env.run(until=horizon)
+    source.flush_metrics()
+    rows = metrics.source_updates
+    assert [t for _, t, _ in rows] == sorted(t for _, t, _ in rows)
+    for res in resources:
+        versions = [v for name, _, v in rows if name == res.name]
+        assert versions == list(range(1, len(versions) + 1))
+        assert res.version == len(versions)
+    assert resources[-1].version == 0
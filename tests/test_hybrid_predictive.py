@@ -0,0 +1,101 @@
+import random
+
+from cache_simulation import des_core
+from cache_simulation.cache import CacheEntry
+from cache_simulation.metrics import MetricsCollector
+from cache_simulation.strategies import hybrid_predictive
+from cache_simulation.strategies.adaptive import AdaptiveTTLStrategy
+from cache_simulation.strategies.hybrid_predictive import HybridPredictiveStrategy
+
+
+def test_update_history_buffer_tracks_window(monkeypatch):
+    """
+    Буфер истории обновлений в несколько раз меньше числа обновлений:
+    при заполнении он уплотняется или растёт, а живой срез
+    [_hist_lo:_hist_hi] всегда равен моментам, ещё попадающим в окно
+    последнего анализа (и не сброшенным после prefetch), по порядку.
+    """
+    monkeypatch.setattr(hybrid_predictive, "_HISTORY_CAPACITY", 8)
+    env = des_core.MicroEnv()
+    metrics = MetricsCollector()
+    strategy = HybridPredictiveStrategy(
+        env=env, metrics=metrics,
+        base_strategy=AdaptiveTTLStrategy(env, metrics, recalc_interval=1000.0),
+        history_window=20.0, analyze_interval=5.0, profile_bin_size=1.0,
+        prefetch_interval=1.0, max_periods=2,
+        k=0.0,  # без prefetch: стратегия не привязана к кешу
+        rng=random.Random(1),
+    )
+
+    def live():
+        return strategy._hist_buf[strategy._hist_lo:strategy._hist_hi].tolist()
+
+    pushed = []
+
+    def push(t):
+        strategy.on_update(CacheEntry(0, t), t)
+        pushed.append(t)
+
+    # обновление каждую единицу времени; анализ (каждые 5) обрезает окно
+    for i in range(102):
+        env.call_later(float(i), push, float(i))
+    env.run(until=101.5)
+    # последний анализ — в t = 100, окно [80, 100]
+    assert live() == [t for t in pushed if t >= 80.0]
+
+    # сброс после успешного prefetch отбрасывает всё до момента fetch включительно
+    strategy.on_prefetch_success(None, 90.0)
+    assert live() == [t for t in pushed if t > 90.0]
+
+    # ещё серия обновлений: буфер снова заполняется, окно сдвигается
+    for i in range(102, 160):
+        env.call_later(float(i) - env.now, push, float(i))
+    env.run(until=163.0)
+    # последний анализ — в t = 160, окно [140, 160]
+    assert live() == [t for t in pushed if t >= 140.0]
+    assert strategy._hist_buf.size < len(pushed)
+
+
+class _RecordingCache:
+    """Заглушка Cache: запоминает запросы, которые стратегия запускает процессами."""
+
+    def __init__(self, env):
+        self.env = env
+        self.calls = []
+
+    def request(self, key, *, is_prefetch=False):
+        self.calls.append((self.env.now, key, is_prefetch))
+        yield self.env.timeout(0)
+
+
+def test_prefetch_fires_in_phase_with_updates():
+    """
+    Обновления строго периодичны (T = 10): профиль, перенесённый на текущий
+    момент по фазе, даёт ненулевую вероятность в бинах обновлений, и
+    _prefetch_loop запускает cache.request(key, is_prefetch=True) —
+    только в тиках, попадающих в фазу обновлений.
+    """
+    env = des_core.MicroEnv()
+    metrics = MetricsCollector()
+    strategy = HybridPredictiveStrategy(
+        env=env, metrics=metrics,
+        base_strategy=AdaptiveTTLStrategy(env, metrics, recalc_interval=1000.0),
+        history_window=40.0, analyze_interval=5.0, profile_bin_size=1.0,
+        prefetch_interval=1.0, max_periods=1,
+        k=100.0,  # p_pred ≈ 1 в бине обновления
+        rng=random.Random(1),
+    )
+    cache = _RecordingCache(env)
+    strategy.bind_cache(cache, "r-1")
+
+    for i in range(12):
+        t = 10.0 * i + 0.5
+        env.call_later(t, strategy.on_update, CacheEntry(0, t), t)
+    env.run(until=120.5)
+
+    assert cache.calls
+    assert all(key == "r-1" and is_prefetch for _, key, is_prefetch in cache.calls)
+    # тики целые, обновления — в бине [10i, 10i + 1): prefetch только в фазе 0
+    assert {t % 10.0 for t, _, _ in cache.calls} == {0.0}
+    triggers = [t for t, event, _, _ in metrics.events if event == "prefetch_trigger"]
+    assert triggers == [t for t, _, _ in cache.calls]
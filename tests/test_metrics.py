@@ -0,0 +1,95 @@
+import io
+import json
+
+import pytest
+
+from cache_simulation import metrics as metrics_module
+from cache_simulation.metrics import HIT_CORRECT, MISS, STALE_INITIAL, MetricsCollector
+from cache_simulation.resources.simple import SimpleResource
+
+
+def _populate(m: MetricsCollector) -> None:
+    """По несколько записей каждого вида, чтобы заполнить все разделы сводки."""
+    res = SimpleResource("r-1", update_rate=0.1)
+    for i in range(7):
+        t = float(i)
+        m.record_event(t, "miss", res.name, i)
+        m.ingest_event_row(MISS, t, 2.5, 0.0, res.name, i, i, finish=t + 2.5)
+        m.ingest_event_row(HIT_CORRECT, t + 0.5, 0.0, 0.5, res.name, i, i, finish=t + 0.5)
+        m.ingest_event_row(STALE_INITIAL, t + 0.7, 0.0, 0.7, res.name, i, None)
+        m.record_source_call(res, t, t + 2.5)
+        res.version += 1
+        m.record_source_update(res, t + 0.1)
+        m.record_ttl_change(t, 60.0 + i)
+        m.record_prefetch(t, res.name)
+    m.record_periods(3.0, [100.0, 50.0])
+    m.ingest_profile(3.0, 100.0, [0.0, 10.0, 20.0], [0.25, 0.5, 0.25])
+    m.record_cache_update()
+    m.record_redundant_miss()
+
+
+@pytest.mark.parametrize("populated", [False, True], ids=["empty", "populated"])
+def test_write_json_round_trip(populated, monkeypatch):
+    """
+    Потоковая запись write_json разбирается обратно в
+    {**header, "metrics": full_summary()}, в т.ч. когда логи пишутся
+    несколькими пачками.
+    """
+    monkeypatch.setattr(metrics_module, "_WRITE_CHUNK", 3)
+    m = MetricsCollector()
+    if populated:
+        _populate(m)
+    header = {"settings": {"name": "тест", "values": [1, 2.5, None]}}
+
+    out = io.BytesIO()
+    m.write_json(out, header)
+
+    assert json.loads(out.getvalue()) == {**header, "metrics": m.full_summary()}
+
+
+def test_events_spill_to_ndjson(tmp_path, monkeypatch):
+    """
+    При events_path события сбрасываются в NDJSON пачками по
+    _EVENT_SPILL_SIZE; сброшенные строки и остаток в памяти вместе дают
+    полный список событий по порядку, а close() дописывает остаток.
+    """
+    monkeypatch.setattr(metrics_module, "_EVENT_SPILL_SIZE", 4)
+    path = tmp_path / "events.ndjson"
+    m = MetricsCollector(events_path=str(path))
+    expected = []
+    for i in range(10):
+        if i % 2:
+            m.record_event(float(i), "miss", "r-1", i)
+            expected.append({"time": float(i), "event": "miss", "key": "r-1", "cache_size": i})
+        else:
+            m.ingest_event_row(HIT_CORRECT, float(i), 0.0, 1.0, "r-1", i, 0, finish=float(i))
+            expected.append({"time": float(i), "event": "hit_correct", "key": "r-1", "cache_size": i})
+
+    in_memory = [
+        {"time": t, "event": e, "key": k, "cache_size": n} for t, e, k, n in m.events
+    ]
+    assert len(in_memory) == 2
+
+    m.close()
+    written = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert written[:8] + in_memory == expected
+    assert written == expected
+    assert m.events == []
+
+
+def test_export_writes_json_and_csv_next_to_stem(tmp_path):
+    """
+    export(path) пишет <path без расширения>.json и .csv, создавая
+    недостающий каталог; в CSV — только скалярные агрегаты.
+    """
+    m = MetricsCollector()
+    _populate(m)
+    m.export(str(tmp_path / "out" / "run.json"))
+
+    base = tmp_path / "out" / "run"
+    assert json.loads(base.with_suffix(".json").read_text(encoding="utf-8")) == json.loads(
+        json.dumps(m.full_summary()))
+    lines = base.with_suffix(".csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "metric,value"
+    scalars = {k for k, v in m.aggregate_summary().items() if not isinstance(v, dict)}
+    assert {line.split(",", 1)[0] for line in lines[1:]} == scalars
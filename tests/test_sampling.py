@@ -0,0 +1,35 @@
+import math
+
+import pytest
+
+from cache_simulation.sampling import sinusoid_interval
+
+PERIOD = 86_400.0
+OMEGA = 2.0 * math.pi / PERIOD
+LAMBDA_BASE = 0.2
+
+
+def _increment(t, tau, amp_base):
+    """Λ(t + τ) − Λ(t) для λ(t) = λ_base + amp_base·sin ωt (в форме приращения)."""
+    return LAMBDA_BASE * tau + amp_base / OMEGA * (math.cos(OMEGA * t) - math.cos(OMEGA * (t + tau)))
+
+
+@pytest.mark.parametrize("amplitude", [0.0, 0.5, 1.0])
+@pytest.mark.parametrize("t", [
+    0.0,
+    1234.5,
+    0.75 * PERIOD,  # минимум λ: при A = 1 интенсивность здесь обращается в ноль
+    0.75 * PERIOD - 1.0,
+    1e9 + 0.75 * PERIOD,  # большое t
+])
+def test_interval_inverts_integrated_rate(amplitude, t):
+    """
+    τ = sinusoid_interval(t, u, …) — корень Λ(t + τ) − Λ(t) = u, в том числе
+    при A = 1 в нуле интенсивности (шаг Ньютона страхуется бисекцией)
+    и при больших t.
+    """
+    amp_base = LAMBDA_BASE * amplitude
+    for u in (1e-6, 1e-3, 0.5, 1.0, 7.0):
+        tau = sinusoid_interval(t, u, LAMBDA_BASE, amp_base, OMEGA)
+        assert tau > 0.0
+        assert _increment(t, tau, amp_base) == pytest.approx(u, rel=1e-8, abs=1e-12)